@@ -0,0 +1,108 @@
+import argparse
+
+import bytecode
+from bytecode import BytecodeError
+
+
+def is_linked(instructions: list) -> bool:
+    for opcode, args in instructions:
+        if opcode == 'linked':
+            return True
+        elif opcode not in bytecode.DIRECTIVES:
+            return False
+
+    return False
+
+
+def check_targets(instructions: list):
+    code = [(opcode, args) for opcode, args in instructions if opcode not in bytecode.DIRECTIVES]
+    for opcode, args in code:
+        if opcode == 'label':
+            raise BytecodeError('Label {} in linked program'.format(args))
+        for target in bytecode.operands_of_kind(opcode, args, 'label'):
+            if not 0 <= target <= len(code):
+                raise BytecodeError('Jump target {} out of range'.format(target))
+
+
+def link(instructions: list) -> list:
+    if is_linked(instructions):
+        check_targets(instructions)
+        return instructions
+
+    symbols = [(opcode, args) for opcode, args in instructions if opcode == 'var']
+    return [('linked', None)] + symbols + relocate([
+        (opcode, args) for opcode, args in instructions if opcode != 'var'
+    ])
+
+
+def relocate(instructions: list, start: int = 0) -> list:
+    offsets = {}
+    position = start
+    for opcode, args in instructions:
+        if opcode == 'label':
+            if args in offsets:
+                raise BytecodeError('Duplicate label {}'.format(args))
+            offsets[args] = position
+        elif opcode not in bytecode.DIRECTIVES:
+            position += 1
+
+    def resolve(label):
+        if label not in offsets:
+            raise BytecodeError('Undefined label {}'.format(label))
+        return offsets[label]
+
+    return [
+        (opcode, bytecode.map_operands(opcode, args, 'label', resolve))
+        for opcode, args in instructions
+        if opcode != 'label'
+    ]
+
+
+def unlink(instructions: list) -> list:
+    if not is_linked(instructions):
+        return instructions
+
+    symbols = [(opcode, args) for opcode, args in instructions if opcode == 'var']
+    code = [(opcode, args) for opcode, args in instructions if opcode not in bytecode.DIRECTIVES]
+    targets = {
+        target
+        for opcode, args in code
+        for target in bytecode.operands_of_kind(opcode, args, 'label')
+    }
+
+    result = list(symbols)
+    position = 0
+    for opcode, args in instructions:
+        if opcode in bytecode.DIRECTIVES:
+            if opcode == 'line':
+                result.append((opcode, args))
+            continue
+        if position in targets:
+            result.append(('label', position))
+        result.append((opcode, args))
+        position += 1
+    if len(code) in targets:
+        result.append(('label', len(code)))
+
+    return result
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Resolve labels to absolute instruction offsets')
+    arg_parser.add_argument('bytecode', help='bytecode path (text or binary)')
+    arg_parser.add_argument('-o', '--output', required=True, help='linked bytecode output path')
+    arg_parser.add_argument('--binary', action='store_true', help='emit binary bytecode instead of text')
+    args = arg_parser.parse_args()
+
+    try:
+        linked = link(bytecode.load(args.bytecode))
+    except BytecodeError as e:
+        print('ERROR: {}'.format(e))
+        exit(1)
+
+    if args.binary:
+        with open(args.output, 'wb') as file:
+            file.write(bytecode.encode(linked))
+    else:
+        with open(args.output, 'w') as file:
+            file.write(bytecode.format_text(linked))
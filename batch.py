@@ -0,0 +1,125 @@
+import argparse
+import contextlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import main
+import optimizer
+from compile_cache import CompileCache
+
+OPTIONS = {}
+CACHE = None
+
+
+def collect_sources(paths: list, pattern: str = '*.txt') -> list:
+    sources = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            sources += [(source, source.relative_to(path)) for source in sorted(path.rglob(pattern))
+                        if source.is_file()]
+        else:
+            sources.append((path, Path(path.name)))
+
+    outputs = {}
+    unique = []
+    for source, relative in sources:
+        key = relative.with_suffix('')
+        if key not in outputs:
+            outputs[key] = source
+            unique.append((source, relative))
+        elif outputs[key].resolve() != source.resolve():
+            raise ValueError('{} and {} would both compile to {}'.format(outputs[key], source, key))
+    return unique
+
+
+def output_path(output_dir, relative: Path, binary=False) -> Path:
+    return Path(output_dir) / relative.with_suffix('.bin' if binary else '.bc')
+
+
+def initialize(options: dict):
+    global CACHE
+
+    OPTIONS.clear()
+    OPTIONS.update(options)
+    CACHE = CompileCache(options['cache_dir']) if options['cache'] else None
+    main.warm_up()
+
+
+def compile_one(job: tuple) -> tuple:
+    source, output = job
+    options = OPTIONS
+    passes = optimizer.create_passes(options['rules']) if options['optimize'] else None
+
+    start = time.perf_counter()
+    messages = io.StringIO()
+    error = None
+    try:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.redirect_stdout(messages), contextlib.redirect_stderr(messages):
+            compiled = main.main(source, output, options['binary'], passes, options['slots'], options['typed'],
+                                 options['link'], options['lines'], CACHE)
+        if not compiled:
+            error = messages.getvalue().strip() or 'Syntax error'
+    except SystemExit:
+        error = messages.getvalue().strip()
+    except Exception as e:
+        error = '{}: {}'.format(type(e).__name__, e)
+
+    if error is not None:
+        with contextlib.suppress(OSError):
+            os.remove(output)
+
+    return str(source), error, time.perf_counter() - start
+
+
+def compile_batch(sources: list, output_dir, jobs: int | None = None, binary=False, optimize=False, rules=None,
+                  slots=False, typed=False, link=False, lines=False, cache=True, cache_dir=None) -> list:
+    options = dict(binary=binary, optimize=optimize, rules=rules, slots=slots, typed=typed, link=link,
+                   lines=lines, cache=cache, cache_dir=cache_dir)
+    batch = [(source, output_path(output_dir, relative, binary)) for source, relative in sources]
+
+    if jobs == 1:
+        initialize(options)
+        return list(map(compile_one, batch))
+
+    jobs = min(jobs or os.cpu_count() or 1, max(len(batch), 1))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=initialize, initargs=(options,)) as executor:
+        return list(executor.map(compile_one, batch, chunksize=max(1, len(batch) // (jobs * 4))))
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Compile many PJP sources in parallel')
+    arg_parser.add_argument('sources', nargs='+', help='source files or directories')
+    arg_parser.add_argument('-o', '--output-dir', default='build', help='directory for the compiled bytecode')
+    arg_parser.add_argument('-j', '--jobs', type=int, help='worker processes (default: one per core)')
+    arg_parser.add_argument('--pattern', default='*.txt', help='source file pattern inside directories')
+    main.add_compiler_arguments(arg_parser)
+    arg_parser.add_argument('--no-cache', action='store_true', help='always recompile, bypassing the bytecode cache')
+    arg_parser.add_argument('--cache-dir', help='bytecode cache directory')
+    args = arg_parser.parse_args()
+
+    try:
+        sources = collect_sources(args.sources, args.pattern)
+    except ValueError as e:
+        print('ERROR: {}'.format(e))
+        exit(1)
+    if not sources:
+        print('ERROR: No sources found')
+        exit(1)
+
+    start = time.perf_counter()
+    results = compile_batch(sources, args.output_dir, args.jobs, args.binary, args.optimize,
+                            main.optimization_rules(args), args.slots, args.typed, args.link,
+                            args.lines, not args.no_cache, args.cache_dir)
+    elapsed = time.perf_counter() - start
+
+    failed = [(source, error) for source, error, seconds in results if error is not None]
+    for source, error in failed:
+        print('ERROR: {}:\n{}'.format(source, error))
+
+    print('Compiled {} of {} files in {:.3f}s'.format(len(results) - len(failed), len(results), elapsed))
+    if failed:
+        exit(1)
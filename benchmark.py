@@ -0,0 +1,248 @@
+import argparse
+import gc
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+
+import bytecode
+import ir
+import optimizer
+from main import parse, tokenize
+from virtual_machine import VirtualMachine
+from visitors import MyVisitor, TypeChecker
+
+VERSION = 1
+PHASES = ['lex', 'parse', 'lower', 'typecheck', 'codegen', 'optimize', 'load', 'execute']
+NESTING_DEPTH = 30
+
+
+def straight_line(size: int) -> str:
+    statements = [
+        'a = a + {};',
+        'b = a * 3 - b % 1000;',
+        'f = f + a / 2.5;',
+        'c = (a % 7) + b - {};',
+        's = s . "x";',
+    ]
+    lines = ['int a, b, c; float f; string s;']
+    lines += [statements[i % len(statements)].format(i) for i in range(size)]
+    lines.append('write a, b, c, f, s;')
+    return '\n'.join(lines)
+
+
+def nested_if(size: int) -> str:
+    lines = ['int a;']
+    for i in range(size):
+        lines += ['if (a > {}) {{'.format(-depth - 1) for depth in range(NESTING_DEPTH)]
+        lines.append('a = a + 1;')
+        lines += ['}'] * NESTING_DEPTH
+    lines.append('write a;')
+    return '\n'.join(lines)
+
+
+def while_counter(size: int) -> str:
+    return 'int i;\nwhile (i < {}) {{\n  i = i + 1;\n}}\nwrite i;'.format(size)
+
+
+def string_build(size: int) -> str:
+    return 'int i; string s;\nwhile (i < {}) {{\n  s = s . "0123456789";\n  i = i + 1;\n}}\nwrite i;'.format(size)
+
+
+def arithmetic(size: int) -> str:
+    return '''int i, a; float f;
+while (i < {}) {{
+  a = (a + i * 3 - (i / 2) % 7) * 2 % 1000 + (i - 1) * (i + 1) % 13;
+  f = f * 0.5 + i / 4.0 - a * 1.5 + (f - 1.0) / (2.0 + i);
+  i = i + 1;
+}}
+write a, f;'''.format(size)
+
+
+WORKLOADS = {
+    'straight_line': (straight_line, 2000),
+    'nested_if': (nested_if, 100),
+    'while_counter': (while_counter, 100000),
+    'string_build': (string_build, 20000),
+    'arithmetic': (arithmetic, 20000),
+}
+
+
+def measure(source: str, slots=False, typed=False, passes=None) -> dict:
+    clock = time.perf_counter
+    times = {}
+
+    def timed(phase, function, *args):
+        gc.collect()
+        gc.disable()
+        try:
+            start = clock()
+            result = function(*args)
+            times[phase] = clock() - start
+        finally:
+            gc.enable()
+        return result
+
+    def lex(contents):
+        stream = tokenize(contents)
+        stream.fill()
+        return stream
+
+    def typecheck(program):
+        type_checker = TypeChecker()
+        type_checker.visit(program)
+        if type_checker.type_errors:
+            raise ValueError(type_checker.type_errors[0])
+
+    def optimize(instructions):
+        instructions = bytecode.parse_text('\n'.join(instructions))
+        for optimization_pass in passes or []:
+            instructions = optimization_pass.optimize(instructions)
+        return bytecode.format_text(instructions)
+
+    def load(text):
+        return VirtualMachine(bytecode.parse_text(text), stdout=io.StringIO())
+
+    stream = timed('lex', lex, source)
+    parser, tree = timed('parse', parse, stream)
+    if parser.getNumberOfSyntaxErrors() != 0:
+        raise ValueError('Syntax errors in workload')
+    program = timed('lower', ir.lower, tree)
+    timed('typecheck', typecheck, program)
+    instructions = timed('codegen', MyVisitor(slots=slots, typed=typed).visit, program)
+    text = timed('optimize', optimize, instructions)
+    vm = timed('load', load, text)
+    timed('execute', vm.execute)
+    return times
+
+
+def run(workloads=None, scale: float = 1.0, repeat: int = 5, slots=False, typed=False, optimize=False) -> dict:
+    results = {}
+    for name in workloads or WORKLOADS:
+        generate, size = WORKLOADS[name]
+        size = max(1, int(size * scale))
+        source = generate(size)
+
+        samples = {phase: [] for phase in PHASES}
+        for _ in range(repeat + 1):
+            passes = optimizer.create_passes() if optimize else None
+            times = measure(source, slots, typed, passes)
+            for phase in PHASES:
+                samples[phase].append(times[phase])
+
+        results[name] = {'size': size, 'phases': {
+            phase: {'min': min(values[1:]), 'median': statistics.median(values[1:]), 'times': values[1:]}
+            for phase, values in samples.items()
+        }}
+
+    return {
+        'version': VERSION,
+        'python': sys.version,
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'scale': scale,
+        'repeat': repeat,
+        'options': {'slots': slots, 'typed': typed, 'optimize': optimize},
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1, min_time: float = 0.001) -> list:
+    rows = []
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+
+        for phase, timing in result['phases'].items():
+            before = baseline['results'][name]['phases'].get(phase)
+            if before is None:
+                continue
+
+            old, new = before['min'], timing['min']
+            change = (new - old) / old if old > 0 else 0.0
+            status = ''
+            if abs(new - old) >= min_time:
+                if change > threshold:
+                    status = 'REGRESSION'
+                elif change < -threshold:
+                    status = 'improvement'
+            rows.append({'workload': name, 'phase': phase, 'baseline': old, 'current': new, 'change': change,
+                         'status': status})
+
+    return rows
+
+
+def format_results(results: dict) -> str:
+    lines = ['{:<14} {}'.format('workload', ' '.join('{:>10}'.format(phase) for phase in PHASES))]
+    for name, result in results['results'].items():
+        lines.append('{:<14} {}'.format(name, ' '.join(
+            '{:>9.4f}s'.format(result['phases'][phase]['min']) for phase in PHASES
+        )))
+    return '\n'.join(lines)
+
+
+def format_comparison(rows: list) -> str:
+    lines = ['{:<14} {:<10} {:>10} {:>10} {:>8}'.format('workload', 'phase', 'baseline', 'current', 'change')]
+    for row in rows:
+        lines.append('{:<14} {:<10} {:>9.4f}s {:>9.4f}s {:>+7.1f}% {}'.format(
+            row['workload'], row['phase'], row['baseline'], row['current'], 100 * row['change'], row['status']
+        ).rstrip())
+    return '\n'.join(lines)
+
+
+def load_results(path) -> dict:
+    with open(path, 'r') as file:
+        results = json.load(file)
+    if results.get('version') != VERSION:
+        raise ValueError('Unsupported benchmark results version in {}'.format(path))
+    return results
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Benchmark the PJP compiler and virtual machine phase by phase')
+    arg_parser.add_argument('-o', '--output', help='write the results to this JSON file')
+    arg_parser.add_argument('--workloads', help='comma separated workloads (default: all of {})'.format(
+        ', '.join(WORKLOADS)))
+    arg_parser.add_argument('--scale', type=float, default=1.0, help='multiply every workload size by this factor')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='timed runs per workload, after one warm-up run')
+    arg_parser.add_argument('--slots', action='store_true', help='compile with variable slots')
+    arg_parser.add_argument('--typed', action='store_true', help='compile with type-specialized opcodes')
+    arg_parser.add_argument('-O', '--optimize', action='store_true', help='run the optimization passes')
+    arg_parser.add_argument('--compare', nargs='+', metavar='RESULTS',
+                            help='baseline JSON, and optionally the current JSON instead of running the benchmarks')
+    arg_parser.add_argument('--threshold', type=float, default=0.1,
+                            help='relative slowdown reported as a regression (default: 0.1)')
+    arg_parser.add_argument('--min-time', type=float, default=0.001,
+                            help='ignore differences below this many seconds (default: 0.001)')
+    args = arg_parser.parse_args()
+
+    workloads = args.workloads.split(',') if args.workloads else None
+    for name in workloads or []:
+        if name not in WORKLOADS:
+            arg_parser.error('unknown workload {}'.format(name))
+    if args.compare and len(args.compare) > 2:
+        arg_parser.error('--compare takes a baseline and at most one current results file')
+
+    try:
+        baseline = load_results(args.compare[0]) if args.compare else None
+        if args.compare and len(args.compare) == 2:
+            current = load_results(args.compare[1])
+        else:
+            current = run(workloads, args.scale, args.repeat, args.slots, args.typed, args.optimize)
+            print(format_results(current))
+    except (OSError, ValueError) as e:
+        print('ERROR: {}'.format(e))
+        exit(1)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(current, file, indent=2)
+
+    if baseline is not None:
+        rows = compare(baseline, current, args.threshold, args.min_time)
+        print(format_comparison(rows))
+        if any(row['status'] == 'REGRESSION' for row in rows):
+            exit(1)
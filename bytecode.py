@@ -0,0 +1,374 @@
+import mmap
+import struct
+import sys
+
+MAGIC = b'PJPB'
+VERSION = 4
+FLAG_LINKED = 1
+
+HEADER = struct.Struct('<4sHHIII')
+LENGTH = struct.Struct('<I')
+CONSTANTS = {
+    'I': struct.Struct('<q'),
+    'F': struct.Struct('<d'),
+    'B': struct.Struct('<?'),
+}
+
+TYPED_OPCODES = {
+    'add': 'if',
+    'sub': 'if',
+    'mul': 'if',
+    'div': 'if',
+    'mod': 'i',
+    'lt': 'if',
+    'gt': 'if',
+    'eq': 'ifsb',
+    'neq': 'ifsb',
+}
+
+BINARY_OPCODES = [
+    'add', 'sub', 'mul', 'div', 'mod', 'concat', 'and', 'or', 'gt', 'lt', 'eq', 'neq',
+    'addi', 'addf', 'subi', 'subf', 'muli', 'mulf', 'divi', 'divf', 'modi',
+    'lti', 'ltf', 'gti', 'gtf',
+    'eqi', 'eqf', 'eqs', 'eqb', 'neqi', 'neqf', 'neqs', 'neqb',
+]
+
+SUPERINSTRUCTION_FAMILIES = {
+    'load_load_{}': ['load', 'load', '{}'],
+    'load_push_{}': ['load', 'push', '{}'],
+    'push_{}': ['push', '{}'],
+    '{}_fjmp': ['{}', 'fjmp'],
+    'load_load_{}_fjmp': ['load', 'load', '{}', 'fjmp'],
+    'load_push_{}_fjmp': ['load', 'push', '{}', 'fjmp'],
+    'load_push_{}_save': ['load', 'push', '{}', 'save'],
+}
+
+SUPERINSTRUCTIONS = {
+    family.format(opcode): (family, opcode, [component.format(opcode) for component in components])
+    for family, components in SUPERINSTRUCTION_FAMILIES.items()
+    for opcode in BINARY_OPCODES
+}
+
+OPCODES = [
+    'add', 'sub', 'mul', 'div', 'mod', 'uminus', 'concat',
+    'and', 'or', 'gt', 'lt', 'eq', 'not', 'itof',
+    'push', 'pop', 'load', 'save',
+    'label', 'jmp', 'fjmp',
+    'print', 'read',
+    'neq',
+    'var', 'linked', 'line',
+    'addi', 'addf', 'subi', 'subf', 'muli', 'mulf', 'divi', 'divf', 'modi',
+    'lti', 'ltf', 'gti', 'gtf',
+    'eqi', 'eqf', 'eqs', 'eqb', 'neqi', 'neqf', 'neqs', 'neqb',
+] + list(SUPERINSTRUCTIONS)
+OPCODE_NUMBERS = {opcode: i for i, opcode in enumerate(OPCODES)}
+
+OPERAND_KINDS = {
+    'push': 'const',
+    'load': 'var',
+    'save': 'var',
+    'label': 'label',
+    'jmp': 'label',
+    'fjmp': 'label',
+    'print': 'count',
+    'read': 'type',
+    'var': 'symbol',
+    'line': 'count',
+}
+OPERAND_KINDS.update({
+    name: tuple(sorted(
+        (OPERAND_KINDS[component] for component in components if component in OPERAND_KINDS),
+        key=lambda kind: kind == 'const'
+    ))
+    for name, (family, opcode, components) in SUPERINSTRUCTIONS.items()
+})
+
+DIRECTIVES = {'var', 'linked', 'line'}
+
+STACK_EFFECTS = {opcode: (2, 1) for opcode in BINARY_OPCODES}
+STACK_EFFECTS.update({
+    'uminus': (1, 1),
+    'not': (1, 1),
+    'itof': (1, 1),
+    'push': (0, 1),
+    'pop': (1, 0),
+    'load': (0, 1),
+    'save': (1, 0),
+    'label': (0, 0),
+    'jmp': (0, 0),
+    'fjmp': (1, 0),
+    'read': (0, 1),
+})
+
+TYPE_LETTERS = {int: 'I', float: 'F', str: 'S', bool: 'B'}
+
+
+class BytecodeError(Exception):
+    pass
+
+
+def autoconvert_bytecode_type(value, _type):
+    if _type == 'F':
+        return float(value)
+    elif _type == 'I':
+        return int(value)
+    elif _type == 'S':
+        return str(value)[1:-1]
+    elif _type == 'B':
+        return value == 'true'
+    else:
+        raise BytecodeError('Undefined type {}'.format(_type))
+
+
+def parse_operand(kind: str | tuple, args: str):
+    if type(kind) is tuple:
+        values = []
+        for i, component_kind in enumerate(kind):
+            if component_kind == 'const' or i == len(kind) - 1:
+                value, args = args, None
+            else:
+                [value, args] = args.split(' ', 1)
+            values.append(parse_operand(component_kind, value))
+        return tuple(values)
+    elif kind == 'const':
+        [_type, value] = args.split(' ', 1)
+        return autoconvert_bytecode_type(value, _type)
+    elif kind == 'var':
+        return int(args) if args.isdigit() else sys.intern(args)
+    elif kind == 'symbol':
+        [slot, name] = args.split(' ', 1)
+        return int(slot), sys.intern(name)
+    elif kind == 'type':
+        return args
+    else:
+        return int(args)
+
+
+def format_operand(kind: str | tuple, value) -> str:
+    if type(kind) is tuple:
+        return ' '.join(format_operand(component_kind, v) for component_kind, v in zip(kind, value))
+    elif kind == 'const':
+        _type = TYPE_LETTERS[type(value)]
+        if _type == 'S':
+            value = '"{}"'.format(value)
+        elif _type == 'B':
+            value = 'true' if value else 'false'
+        return '{} {}'.format(_type, value)
+    elif kind == 'symbol':
+        return '{} {}'.format(*value)
+    return str(value)
+
+
+def operands_of_kind(opcode: str, args, kind: str) -> list:
+    kinds = OPERAND_KINDS.get(opcode)
+    if type(kinds) is tuple:
+        return [value for component_kind, value in zip(kinds, args) if component_kind == kind]
+    return [args] if kinds == kind else []
+
+
+def map_operands(opcode: str, args, kind: str, function):
+    kinds = OPERAND_KINDS.get(opcode)
+    if type(kinds) is tuple:
+        return tuple(function(value) if component_kind == kind else value
+                     for component_kind, value in zip(kinds, args))
+    return function(args) if kinds == kind else args
+
+
+def expand(opcode: str, args) -> list:
+    if opcode not in SUPERINSTRUCTIONS:
+        return [(opcode, args)]
+
+    operands = list(args)
+    const = operands.pop() if 'const' in OPERAND_KINDS[opcode] else None
+
+    result = []
+    for component in SUPERINSTRUCTIONS[opcode][2]:
+        kind = OPERAND_KINDS.get(component)
+        if kind is None:
+            result.append((component, None))
+        elif kind == 'const':
+            result.append((component, const))
+        else:
+            result.append((component, operands.pop(0)))
+
+    return result
+
+
+def parse_instruction(instruction_str: str):
+    instruction_split = instruction_str.split(' ', 1)
+    opcode = instruction_split[0]
+    args = None if len(instruction_split) == 1 else instruction_split[1]
+
+    if opcode not in OPCODE_NUMBERS:
+        raise BytecodeError('Unknown instruction {}'.format(instruction_str))
+
+    kind = OPERAND_KINDS.get(opcode)
+    if kind is not None:
+        try:
+            args = parse_operand(kind, args)
+        except (ValueError, TypeError, AttributeError) as e:
+            raise BytecodeError('Malformed operand in {}: {}'.format(instruction_str, e)) from None
+
+    return opcode, args
+
+
+def format_instruction(opcode: str, args) -> str:
+    kind = OPERAND_KINDS.get(opcode)
+    if kind is None:
+        return opcode
+    return '{} {}'.format(opcode, format_operand(kind, args))
+
+
+def parse_text(byte_code: str):
+    lines = (line.strip() for line in byte_code.split('\n'))
+    return [parse_instruction(line) for line in lines if line != '']
+
+
+def format_text(instructions) -> str:
+    return '\n'.join(format_instruction(opcode, args) for opcode, args in instructions)
+
+
+def resolve_symbols(instructions) -> list:
+    symbols = dict(args for opcode, args in instructions if opcode == 'var')
+
+    def resolve(value):
+        return symbols[value] if type(value) is int else value
+
+    return [
+        (opcode, map_operands(opcode, args, 'var', resolve))
+        for opcode, args in instructions
+        if opcode != 'var'
+    ]
+
+
+def encode(instructions) -> bytes:
+    constants = {}
+    pool = []
+    names = {args[1]: args[0] for opcode, args in instructions if opcode == 'var'}
+    flags = FLAG_LINKED if any(opcode == 'linked' for opcode, args in instructions) else 0
+    words = []
+
+    def encode_operand(kind: str, value) -> int:
+        if kind == 'const':
+            key = (type(value), repr(value))
+            if key not in constants:
+                constants[key] = len(pool)
+                pool.append(value)
+            return constants[key]
+        elif kind == 'var':
+            return value if type(value) is int else names.setdefault(value, len(names))
+        elif kind == 'type':
+            return ord(value)
+        return value
+
+    for opcode, args in instructions:
+        kind = OPERAND_KINDS.get(opcode)
+        if opcode == 'var' or opcode == 'linked':
+            continue
+
+        words.append(OPCODE_NUMBERS[opcode])
+        if type(kind) is tuple:
+            words.extend(encode_operand(component_kind, value) for component_kind, value in zip(kind, args))
+        elif kind is not None:
+            words.append(encode_operand(kind, args))
+
+    data = bytearray(HEADER.pack(MAGIC, VERSION, flags, len(constants), len(names), len(words)))
+    for value in pool:
+        letter = TYPE_LETTERS[type(value)]
+        data += letter.encode('ascii')
+        if letter == 'S':
+            encoded = value.encode('utf-8')
+            data += LENGTH.pack(len(encoded)) + encoded
+        else:
+            try:
+                data += CONSTANTS[letter].pack(value)
+            except struct.error:
+                raise BytecodeError('Constant {} does not fit in the binary format'.format(value)) from None
+
+    for name in sorted(names, key=names.get):
+        encoded = name.encode('utf-8')
+        data += LENGTH.pack(len(encoded)) + encoded
+
+    return bytes(data + struct.pack('<{}i'.format(len(words)), *words))
+
+
+def decode(buffer) -> list:
+    view = memoryview(buffer)
+    magic, version, flags, constant_count, name_count, word_count = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise BytecodeError('Not a binary bytecode file')
+    if version != VERSION:
+        raise BytecodeError('Unsupported bytecode version {}'.format(version))
+
+    offset = HEADER.size
+    constants = []
+    for _ in range(constant_count):
+        letter = chr(view[offset])
+        offset += 1
+        if letter == 'S':
+            [length] = LENGTH.unpack_from(view, offset)
+            offset += LENGTH.size
+            constants.append(str(view[offset:offset + length], 'utf-8'))
+            offset += length
+        else:
+            [value] = CONSTANTS[letter].unpack_from(view, offset)
+            offset += CONSTANTS[letter].size
+            constants.append(value)
+
+    instructions = [('linked', None)] if flags & FLAG_LINKED else []
+    for slot in range(name_count):
+        [length] = LENGTH.unpack_from(view, offset)
+        offset += LENGTH.size
+        instructions.append(('var', (slot, sys.intern(str(view[offset:offset + length], 'utf-8')))))
+        offset += length
+
+    words = struct.unpack_from('<{}i'.format(word_count), view, offset)
+    view.release()
+
+    def decode_operand(kind: str, value):
+        if kind == 'const':
+            return constants[value]
+        elif kind == 'type':
+            return chr(value)
+        return value
+
+    i = 0
+    while i < word_count:
+        opcode = OPCODES[words[i]]
+        kind = OPERAND_KINDS.get(opcode)
+        i += 1
+
+        args = None
+        if type(kind) is tuple:
+            args = tuple(decode_operand(component_kind, value)
+                         for component_kind, value in zip(kind, words[i:i + len(kind)]))
+            i += len(kind)
+        elif kind is not None:
+            args = decode_operand(kind, words[i])
+            i += 1
+
+        instructions.append((opcode, args))
+
+    return instructions
+
+
+def is_binary(path) -> bool:
+    with open(path, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def load(path) -> list:
+    if not is_binary(path):
+        with open(path, 'r') as file:
+            return parse_text(file.read())
+
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return decode(buffer)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 2:
+        print(format_text(load(sys.argv[1])))
+    else:
+        print('No bytecode path specified')
@@ -0,0 +1,49 @@
+import base64
+import sys
+
+import main
+import optimizer
+import server
+from compile_cache import CompileCache
+
+if __name__ == '__main__':
+    arg_parser = main.argument_parser(description='Compile through the compile server (falls back to main.py)')
+    arg_parser.add_argument('--socket', default=server.DEFAULT_SOCKET, help='Unix socket path (default: %(default)s)')
+    args = arg_parser.parse_args()
+
+    with open(args.source, 'r') as file:
+        contents = file.read()
+
+    options = dict(binary=args.binary, slots=args.slots, typed=args.typed, link=args.link, lines=args.lines,
+                   optimize=args.optimize, rules=args.rules.split(',') if args.rules else None, stats=args.stats,
+                   cache=not args.no_cache)
+    try:
+        response = server.request({'command': 'compile', 'source': contents, 'options': options}, args.socket)
+    except OSError:
+        passes = optimizer.create_passes(options['rules']) if args.optimize else []
+        cache = None if args.no_cache or args.stats or args.stream else CompileCache(args.cache_dir, args.cache_size)
+        main.main(args.source, args.output, args.binary, passes, args.slots, args.typed, args.link, args.lines, cache,
+                  args.stream)
+        if args.stats:
+            for optimization_pass in passes:
+                print(optimization_pass.report())
+        if args.cache_stats and cache is not None:
+            print(cache.report())
+        exit(0)
+    except ValueError as e:
+        print('ERROR: Bad response from the compile server at {}: {}'.format(args.socket, e))
+        exit(1)
+
+    if response['ok']:
+        data = base64.b64decode(response['bytecode'])
+        if args.output == '-':
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+        else:
+            with open(args.output or main.default_output(args.binary), 'wb') as file:
+                file.write(data)
+
+    print(response['messages'], end='')
+    if args.cache_stats:
+        print(server.format_stats(server.request({'command': 'stats'}, args.socket)['stats']))
+    exit(response['exit'])
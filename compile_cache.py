@@ -0,0 +1,107 @@
+import contextlib
+import hashlib
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+GRAMMAR = Path('grammar') / 'PjpGrammar.g4'
+
+
+def compiler_files(base_dir=BASE_DIR) -> list:
+    return sorted(path.relative_to(base_dir) for path in Path(base_dir).glob('*.py')) + [GRAMMAR]
+
+
+def compiler_version(base_dir=BASE_DIR) -> str:
+    digest = hashlib.sha256()
+    for name in compiler_files(base_dir):
+        digest.update(str(name).encode('utf-8') + b'\0')
+        with open(Path(base_dir) / name, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+class CompileCache:
+    DEFAULT_DIRECTORY = BASE_DIR / '__pycache__' / 'pjp-bytecode'
+    DEFAULT_MAX_SIZE = 64 << 20
+
+    def __init__(self, directory=None, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = self.DEFAULT_DIRECTORY if directory is None else Path(directory)
+        self.max_size = max_size
+        self.version = compiler_version()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, contents: str, **options) -> str:
+        digest = hashlib.sha256(self.version.encode('ascii'))
+        digest.update(repr(sorted(options.items())).encode('utf-8'))
+        digest.update(contents.encode('utf-8'))
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / key
+
+    def reader(self, key: str):
+        path = self.path(key)
+        try:
+            os.utime(path)
+            file = open(path, 'rb')
+        except OSError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return file
+
+    @contextlib.contextmanager
+    def writer(self, key: str):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = self.path('{}.{}.tmp'.format(key, os.getpid()))
+        try:
+            with open(temporary, 'wb') as file:
+                yield file
+            os.replace(temporary, self.path(key))
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temporary)
+            raise
+
+        self.evict()
+
+    def get(self, key: str) -> bytes | None:
+        file = self.reader(key)
+        if file is None:
+            return None
+
+        with file:
+            return file.read()
+
+    def put(self, key: str, data: bytes):
+        with self.writer(key) as file:
+            file.write(data)
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        if self.directory.exists():
+            for entry in os.scandir(self.directory):
+                os.remove(entry.path)
+
+    def report(self) -> str:
+        return 'cache: {} hits, {} misses, {} evicted'.format(self.hits, self.misses, self.evictions)
@@ -0,0 +1,301 @@
+import argparse
+import collections
+import contextlib
+import io
+import os
+import re
+import time
+
+import assembler
+import bytecode
+import main
+
+BOUNDARY_TOKENS = re.compile(r'"(?:[^"\\\r\n]|\\.)*"|//[^\r\n]*|[(){};]')
+SKIP = re.compile(r'(?:\s+|//[^\r\n]*)*')
+ELSE = re.compile(r'else(?![a-z])')
+DEPTH = {'(': 1, '{': 1, ')': -1, '}': -1}
+
+
+def split(contents: str) -> tuple:
+    spans = []
+    start = SKIP.match(contents).end()
+    depth = 0
+    for token in BOUNDARY_TOKENS.finditer(contents, start):
+        text = token.group()
+        depth += DEPTH.get(text, 0)
+        if depth != 0 or text not in ';}':
+            continue
+
+        following = SKIP.match(contents, token.end()).end()
+        if not ELSE.match(contents, following):
+            spans.append((start, token.end()))
+            start = following
+
+    complete = start == len(contents)
+    if not complete:
+        spans.append((start, len(contents)))
+    return spans, complete
+
+
+def statements(contents: str):
+    line, position = 1, 0
+    for start, end in split(contents)[0]:
+        line += contents.count('\n', position, start)
+        position = start
+        yield contents[start:end], line, start - contents.rfind('\n', 0, start) - 1
+
+
+class Scope(collections.ChainMap):
+    def __init__(self, env: dict, uses: dict):
+        super().__init__({}, env)
+        self.uses = uses
+
+    def record(self, name: str):
+        if name not in self.maps[0] and name not in self.uses:
+            var = self.maps[1].get(name)
+            self.uses[name] = None if var is None else var['type']
+
+    def __getitem__(self, name: str):
+        self.record(name)
+        return super().__getitem__(name)
+
+    def __contains__(self, name: str):
+        self.record(name)
+        return super().__contains__(name)
+
+    def __len__(self) -> int:
+        return len(self.maps[0]) + len(self.maps[1])
+
+
+class Unit:
+    __slots__ = ('instructions', 'labels', 'uses', 'declares', 'line', 'last_line', 'continues', 'type_errors')
+
+    def __init__(self, instructions: list, labels: int, uses: dict, declares: list, line: int | None,
+                 last_line: int | None, continues: bool, type_errors: list):
+        self.instructions = instructions
+        self.labels = labels
+        self.uses = uses
+        self.declares = declares
+        self.line = line
+        self.last_line = last_line
+        self.continues = continues
+        self.type_errors = type_errors
+
+
+class SyntaxErrors:
+    def __init__(self):
+        self.count = 0
+
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        self.count += 1
+
+    def reportAmbiguity(self, *args):
+        pass
+
+    def reportAttemptingFullContext(self, *args):
+        pass
+
+    def reportContextSensitivity(self, *args):
+        pass
+
+
+class IncrementalCompiler:
+    def __init__(self, passes=None, slots=False, typed=False, link=False, lines=False):
+        self.passes = passes or []
+        self.slots = slots
+        self.typed = typed
+        self.link = link
+        self.lines = lines
+        self.units = {}
+        self.type_errors = []
+        self.compiled = 0
+        self.reused = 0
+
+    @staticmethod
+    def fits(unit: Unit, env: dict, last_line: int | None) -> bool:
+        if unit.line is not None and unit.continues != (last_line == unit.line):
+            return False
+        return all((env[name]['type'] if name in env else None) == _type for name, _type in unit.uses.items())
+
+    def parse(self, text: str, line: int, column: int):
+        from antlr4 import CommonTokenStream, InputStream, Token
+        from grammar.PjpGrammarLexer import PjpGrammarLexer as Lexer
+
+        errors = SyntaxErrors()
+        lexer = Lexer(InputStream(text))
+        lexer.line = line
+        lexer.column = column
+        lexer.removeErrorListeners()
+        lexer.addErrorListener(errors)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            parser, tree = main.parse(CommonTokenStream(lexer))
+        if errors.count or parser.getNumberOfSyntaxErrors() or parser.getTokenStream().LA(1) != Token.EOF:
+            return None
+        return tree
+
+    def compile_statement(self, text: str, line: int, column: int, env: dict, last_line: int | None = None):
+        import ir
+        from visitors import MyVisitor, TypeChecker
+
+        tree = self.parse(text, line, column)
+        if tree is None:
+            return None
+        program = ir.lower(tree)
+
+        uses = {}
+        type_checker = TypeChecker()
+        type_checker.vars = Scope(env, uses)
+        type_checker.visit(program)
+        if type_checker.type_errors:
+            declares = [(name, var['type']) for name, var in type_checker.vars.maps[0].items()]
+            return Unit([], 0, uses, declares, None, None, False, type_checker.type_errors)
+
+        visitor = MyVisitor(typed=self.typed, lines=self.lines)
+        visitor.vars = Scope(env, uses)
+        visitor.last_line = last_line
+        visitor.visitStatements(program.statements)
+
+        instructions = bytecode.parse_text("\n".join(visitor.instuctions))
+        for optimization_pass in self.passes:
+            instructions = optimization_pass.optimize(instructions)
+
+        first_line = program.statements[0].line if self.lines and program.statements else None
+        declares = [(name, var['type']) for name, var in visitor.vars.maps[0].items()]
+        return Unit(instructions, visitor.last_label_id + 1, uses, declares, first_line,
+                    None if first_line is None else visitor.last_line, first_line == last_line, [])
+
+    @staticmethod
+    def declare(unit: Unit, env: dict):
+        for name, _type in unit.declares:
+            env[name] = {'type': _type, 'slot': len(env)}
+
+    def assemble(self, units: list, env: dict) -> list:
+        instructions = [('linked', None)] if self.link else []
+        if self.slots:
+            instructions += [('var', (var['slot'], name)) for name, var in env.items()]
+
+        base = position = 0
+        for unit in units:
+            chunk = unit.instructions
+            if self.slots:
+                chunk = [(opcode, bytecode.map_operands(opcode, args, 'var', lambda name: env[name]['slot']))
+                         for opcode, args in chunk]
+            if self.link:
+                chunk = assembler.relocate(chunk, position)
+                position += sum(1 for opcode, args in chunk if opcode not in bytecode.DIRECTIVES)
+            elif base:
+                chunk = [(opcode, bytecode.map_operands(opcode, args, 'label', lambda label: label + base))
+                         for opcode, args in chunk]
+            base += unit.labels
+            instructions += chunk
+
+        return instructions
+
+    def compile(self, contents: str) -> list | None:
+        self.compiled = self.reused = 0
+        self.type_errors = []
+
+        env = {}
+        units = []
+        cache = {}
+        last_line = None
+        for text, line, column in statements(contents):
+            key = (line, text) if self.lines else text
+            unit = next((unit for unit in self.units.get(key, ()) if self.fits(unit, env, last_line)), None)
+            if unit is None:
+                try:
+                    unit = self.compile_statement(text, line, column, env, last_line)
+                except LookupError:
+                    unit = None
+                if unit is None:
+                    return self.fallback(contents)
+                self.compiled += 1
+            else:
+                self.reused += 1
+
+            self.declare(unit, env)
+            if unit.last_line is not None:
+                last_line = unit.last_line
+            if unit.type_errors:
+                self.type_errors += unit.type_errors
+                continue
+
+            candidates = cache.setdefault(key, [])
+            if unit not in candidates:
+                candidates.append(unit)
+            units.append(unit)
+
+        if not units and not self.type_errors:
+            return self.fallback(contents)
+
+        self.units = cache
+        main.report_type_errors(self)
+        return self.assemble(units, env)
+
+    def fallback(self, contents: str) -> list | None:
+        program = main.check(contents)
+        if program is None:
+            return None
+
+        return [instruction for chunk in main.emit(program, self.passes, self.slots, self.typed, self.link, self.lines)
+                for instruction in bytecode.parse_text("\n".join(chunk))]
+
+    def report(self) -> str:
+        return '{} statements compiled, {} reused'.format(self.compiled, self.reused)
+
+
+def write(instructions: list, output, binary=False):
+    if binary:
+        data = bytecode.encode(instructions)
+    else:
+        data = "\n".join(bytecode.format_instruction(opcode, args) for opcode, args in instructions).encode('utf-8')
+
+    with main.open_output(output) as file:
+        file.write(data)
+
+
+def build(compiler: IncrementalCompiler, path, output, binary=False) -> bool:
+    with open(path, 'r') as file:
+        contents = file.read()
+
+    start = time.perf_counter()
+    instructions = compiler.compile(contents)
+    if instructions is None:
+        return False
+
+    write(instructions, output, binary)
+    print('{} in {:.1f}ms'.format(compiler.report(), 1000 * (time.perf_counter() - start)), flush=True)
+    return True
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Recompile only the statements that changed since the last build')
+    arg_parser.add_argument('source', help='source code path')
+    arg_parser.add_argument('-o', '--output', help='bytecode output path, - for stdout')
+    main.add_compiler_arguments(arg_parser)
+    arg_parser.add_argument('--watch', action='store_true', help='keep running and rebuild whenever the source changes')
+    arg_parser.add_argument('--interval', type=float, default=0.2, help='seconds between checks with --watch')
+    args = arg_parser.parse_args()
+
+    passes = main.optimization_passes(args)
+    compiler = IncrementalCompiler(passes, args.slots, args.typed, args.link, args.lines)
+    output = args.output or main.default_output(args.binary)
+
+    if not args.watch:
+        exit(0 if build(compiler, args.source, output, args.binary) else 1)
+
+    main.warm_up()
+    modified = None
+    try:
+        while True:
+            stat = os.stat(args.source)
+            if (stat.st_mtime_ns, stat.st_size) != modified:
+                modified = (stat.st_mtime_ns, stat.st_size)
+                try:
+                    build(compiler, args.source, output, args.binary)
+                except SystemExit:
+                    pass
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,228 @@
+import sys
+
+from antlr4.tree.Tree import TerminalNode
+
+from grammar.PjpGrammarParser import PjpGrammarParser
+from grammar.PjpGrammarVisitor import PjpGrammarVisitor
+
+
+class Node:
+    __slots__ = ()
+
+
+class Statement(Node):
+    __slots__ = ('line',)
+
+
+class Program(Node):
+    __slots__ = ('statements',)
+
+    def __init__(self, statements: list):
+        self.statements = statements
+
+
+class Write(Statement):
+    __slots__ = ('expressions',)
+
+    def __init__(self, expressions: list):
+        self.expressions = expressions
+
+
+class Read(Statement):
+    __slots__ = ('names',)
+
+    def __init__(self, names: list):
+        self.names = names
+
+
+class Declaration(Statement):
+    __slots__ = ('type_name', 'names')
+
+    def __init__(self, type_name: str, names: list):
+        self.type_name = type_name
+        self.names = names
+
+
+class Assignment(Statement):
+    __slots__ = ('names', 'positions', 'expression')
+
+    def __init__(self, names: list, positions: list, expression):
+        self.names = names
+        self.positions = positions
+        self.expression = expression
+
+
+class If(Statement):
+    __slots__ = ('condition', 'then_body', 'else_body')
+
+    def __init__(self, condition, then_body: list, else_body: list):
+        self.condition = condition
+        self.then_body = then_body
+        self.else_body = else_body
+
+
+class While(Statement):
+    __slots__ = ('condition', 'body')
+
+    def __init__(self, condition, body: list):
+        self.condition = condition
+        self.body = body
+
+
+class Expression(Node):
+    __slots__ = ('type',)
+
+
+class Binary(Expression):
+    __slots__ = ('op', 'left', 'right')
+
+    def __init__(self, op: str, left: Expression, right: Expression):
+        self.type = None
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class Not(Expression):
+    __slots__ = ('expression',)
+
+    def __init__(self, expression: Expression):
+        self.type = None
+        self.expression = expression
+
+
+class Number(Expression):
+    __slots__ = ('value',)
+
+    def __init__(self, value: int | float):
+        self.type = None
+        self.value = value
+
+
+class String(Expression):
+    __slots__ = ('value',)
+
+    def __init__(self, value: str):
+        self.type = None
+        self.value = value
+
+
+class Bool(Expression):
+    __slots__ = ('value',)
+
+    def __init__(self, value: bool):
+        self.type = None
+        self.value = value
+
+
+class Variable(Expression):
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.type = None
+        self.name = name
+
+
+class Visitor:
+    def visit(self, node: Node):
+        return getattr(self, 'visit' + type(node).__name__)(node)
+
+    def visitStatements(self, statements: list):
+        for statement in statements:
+            self.visit(statement)
+
+
+class Lowering(PjpGrammarVisitor):
+    @staticmethod
+    def release(ctx) -> list:
+        children, ctx.children = ctx.children, None
+        return children
+
+    def visitStatements(self, statements: list) -> list:
+        nodes = []
+        statements.reverse()
+        while statements:
+            statement = statements.pop()
+            node = statement.accept(self)
+            if node is not None:
+                node.line = statement.start.line
+                nodes.append(node)
+
+        return nodes
+
+    def visitProgram(self, ctx: PjpGrammarParser.ProgramContext):
+        return Program(self.visitStatements(self.release(ctx)))
+
+    def visitStatement(self, ctx: PjpGrammarParser.StatementContext):
+        child = self.release(ctx)[0]
+        return None if isinstance(child, TerminalNode) else child.accept(self)
+
+    def visitWrite(self, ctx: PjpGrammarParser.WriteContext):
+        return Write([value.accept(self) for value in self.release(ctx)[1::2]])
+
+    def visitRead(self, ctx: PjpGrammarParser.ReadContext):
+        return Read([sys.intern(_id.symbol.text) for _id in self.release(ctx)[1::2]])
+
+    def visitVariableDeclaration(self, ctx: PjpGrammarParser.VariableDeclarationContext):
+        children = self.release(ctx)
+        return Declaration(sys.intern(children[0].symbol.text), [sys.intern(_id.symbol.text) for _id in children[1::2]])
+
+    def visitVariableAssignment(self, ctx: PjpGrammarParser.VariableAssignmentContext):
+        children = self.release(ctx)
+        ids = [_id.symbol for _id in children[:-1:2]]
+        return Assignment(
+            [sys.intern(token.text) for token in ids],
+            [(token.line, token.column) for token in ids],
+            children[-1].accept(self)
+        )
+
+    def visitIfStatement(self, ctx: PjpGrammarParser.IfStatementContext):
+        children = self.release(ctx)
+        return If(children[2].accept(self), self.visitStatements([children[4]]), self.visitStatements([children[6]]))
+
+    def visitIfStatementBody(self, ctx: PjpGrammarParser.IfStatementBodyContext):
+        children = self.release(ctx)
+        return If(children[2].accept(self), self.visitStatements(children[5:-1]), [])
+
+    def visitWhileStatement(self, ctx: PjpGrammarParser.WhileStatementContext):
+        children = self.release(ctx)
+        return While(children[2].accept(self), self.visitStatements(children[5:-1]))
+
+    def visitBinary(self, ctx):
+        left, op, right = self.release(ctx)
+        return Binary(sys.intern(op.symbol.text), left.accept(self), right.accept(self))
+
+    visitMulDivModExpression = visitBinary
+    visitAddSubExpression = visitBinary
+    visitLogicalExpression = visitBinary
+    visitLesserGreaterExpression = visitBinary
+    visitEqualNotEqualExpression = visitBinary
+
+    def visitConcatExpression(self, ctx: PjpGrammarParser.ConcatExpressionContext):
+        left, op, right = self.release(ctx)
+        return Binary('.', left.accept(self), right.accept(self))
+
+    def visitParenExpression(self, ctx: PjpGrammarParser.ParenExpressionContext):
+        return self.release(ctx)[1].accept(self)
+
+    def visitIdExpression(self, ctx: PjpGrammarParser.IdExpressionContext):
+        return Variable(sys.intern(self.release(ctx)[0].symbol.text))
+
+    def visitNumberExpression(self, ctx: PjpGrammarParser.NumberExpressionContext):
+        token = self.release(ctx)[0].symbol
+        if token.type == PjpGrammarParser.INT:
+            return Number(int(token.text))
+        return Number(float(token.text))
+
+    def visitStringExpression(self, ctx: PjpGrammarParser.StringExpressionContext):
+        return String(self.release(ctx)[0].symbol.text)
+
+    def visitBoolExpression(self, ctx: PjpGrammarParser.BoolExpressionContext):
+        return Bool(self.release(ctx)[0].symbol.text == 'true')
+
+    def visitNotExpression(self, ctx: PjpGrammarParser.NotExpressionContext):
+        return Not(self.release(ctx)[1].accept(self))
+
+
+def lower(tree: PjpGrammarParser.ProgramContext) -> Program:
+    return tree.accept(Lowering())
@@ -1,44 +1,376 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
 import sys
 from pathlib import Path
 
-from antlr4 import *
+import assembler
+import bytecode
+import optimizer
+from compile_cache import CompileCache
 
-from grammar.PjpGrammarLexer import PjpGrammarLexer as Lexer
-from grammar.PjpGrammarParser import PjpGrammarParser as Parser
-from visitors import ErrorListener, TypeChecker, MyVisitor
 
+def tokenize(contents: str):
+    from antlr4 import CommonTokenStream, InputStream
+    from grammar.PjpGrammarLexer import PjpGrammarLexer as Lexer
+
+    return CommonTokenStream(Lexer(InputStream(contents)))
 
-def main(path):
-    with open(path, 'r') as file:
-        contents = file.read()
 
-    lexer = Lexer(InputStream(contents))
-    stream = CommonTokenStream(lexer)
+def parse(contents):
+    from antlr4 import CommonTokenStream
+    from antlr4.atn.PredictionMode import PredictionMode
+    from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+    from antlr4.error.Errors import ParseCancellationException
+    from grammar.PjpGrammarParser import PjpGrammarParser as Parser
+    from visitors import ErrorListener
+
+    stream = contents if isinstance(contents, CommonTokenStream) else tokenize(contents)
     parser = Parser(stream)
 
     parser.removeErrorListeners()
-    parser.addErrorListener(ErrorListener())
+    parser._interp.predictionMode = PredictionMode.SLL
+    parser._errHandler = BailErrorStrategy()
+    try:
+        return parser, parser.program()
+    except ParseCancellationException:
+        parser.reset()
+        parser.addErrorListener(ErrorListener())
+        parser._interp.predictionMode = PredictionMode.LL
+        parser._errHandler = DefaultErrorStrategy()
+        return parser, parser.program()
+
+
+def warm_up(paths=None):
+    if paths is None:
+        paths = sorted((Path(__file__).parent / 'examples').glob('example[0-9]*[0-9].txt'))
+
+    for path in paths:
+        with open(path, 'r') as file:
+            parse(file.read())
+
+
+def check(contents: str):
+    import ir
+    from visitors import TypeChecker
+
+    parser, tree = parse(contents)
+    if parser.getNumberOfSyntaxErrors() != 0:
+        return None
+
+    parser.getTokenStream().tokens = []
+    del parser
+    program = ir.lower(tree)
+    del tree
+
+    type_checker = TypeChecker()
+    type_checker.visit(program)
+    report_type_errors(type_checker)
+
+    return program
+
+
+def report_type_errors(type_checker):
+    if len(type_checker.type_errors) > 0:
+        print('Type errors:')
+        for e in type_checker.type_errors:
+            print(e)
+        exit(1)
+
+
+def statement_parser(input_stream):
+    from antlr4.CommonTokenFactory import CommonTokenFactory
+    from grammar.PjpGrammarLexer import PjpGrammarLexer as Lexer
+    from grammar.PjpGrammarParser import PjpGrammarParser as Parser
+    from mapped_input import StatementTokenStream
+
+    lexer = Lexer(input_stream)
+    lexer._factory = CommonTokenFactory(copyText=True)
+    parser = Parser(StatementTokenStream(lexer))
+    parser.removeErrorListeners()
+    return parser
+
+
+def report_syntax_errors(path):
+    from antlr4 import CommonTokenStream
+    from grammar.PjpGrammarLexer import PjpGrammarLexer as Lexer
+    from mapped_input import MappedInputStream
+
+    with MappedInputStream(path) as input_stream:
+        lexer = Lexer(input_stream)
+        lexer.removeErrorListeners()
+        parse(CommonTokenStream(lexer))
+
+
+def parse_statements(parser):
+    from antlr4 import Token
+    from antlr4.atn.PredictionMode import PredictionMode
+    from antlr4.atn.Transition import RuleTransition
+    from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+    from antlr4.error.Errors import ParseCancellationException
+
+    stream = parser.getTokenStream()
+    if stream.LA(1) == Token.EOF:
+        parser.program()
+        return
+
+    program = parser.ProgramContext(parser)
+    [invoking_state] = [
+        state.stateNumber for state in parser.atn.states
+        if state.ruleIndex == parser.RULE_program and any(
+            isinstance(transition, RuleTransition) and transition.target.ruleIndex == parser.RULE_statement
+            for transition in state.transitions
+        )
+    ]
+
+    def parse_statement(prediction_mode, error_strategy):
+        program.children = None
+        parser._ctx = program
+        parser.state = invoking_state
+        parser._interp.predictionMode = prediction_mode
+        parser._errHandler = error_strategy
+        return parser.statement()
+
+    while stream.LA(1) != Token.EOF:
+        start = stream.index
+        try:
+            statement = parse_statement(PredictionMode.SLL, BailErrorStrategy())
+        except ParseCancellationException:
+            stream.seek(start)
+            parser._syntaxErrors = 0
+            statement = parse_statement(PredictionMode.LL, DefaultErrorStrategy())
+
+        program.children = None
+        if parser.getNumberOfSyntaxErrors() != 0:
+            return
+        yield statement
+        del statement
+        stream.discard()
+
+
+def check_statements(statements, type_checker):
+    import ir
+
+    lowering = ir.Lowering()
+    for statement in statements:
+        for node in lowering.visitStatements([statement]):
+            type_checker.visit(node)
+            yield node
+
+
+def emit_statements(nodes, type_checker, slots=False, typed=False, lines=False):
+    from visitors import MyVisitor
+
+    visitor = MyVisitor(slots=slots, typed=typed, lines=lines)
+    for node in nodes:
+        if type_checker.type_errors:
+            continue
+
+        chunk = visitor.emit_statement(node)
+        if slots:
+            chunk = ['var {} {}'.format(visitor.vars[name]['slot'], name)
+                     for name in visitor.declared_names([node])] + chunk
+        yield chunk
+
+
+def emit(program, passes=None, slots=False, typed=False, link=False, lines=False):
+    from visitors import MyVisitor
+
+    yield from assemble(MyVisitor(slots=slots, typed=typed, lines=lines).stream(program), passes, link)
+
+
+def assemble(chunks, passes=None, link=False):
+    if link:
+        yield ['linked']
 
-    tree = parser.program()
-    if parser.getNumberOfSyntaxErrors() == 0:
-        type_checker = TypeChecker()
-        type_checker.visit(tree)
+    position = 0
+    for chunk in chunks:
+        if passes or link:
+            instructions = bytecode.parse_text("\n".join(chunk))
+            for optimization_pass in passes or []:
+                instructions = optimization_pass.optimize(instructions)
+            if link:
+                instructions = assembler.relocate(instructions, position)
+                position += sum(1 for opcode, args in instructions if opcode not in bytecode.DIRECTIVES)
+            chunk = [bytecode.format_instruction(opcode, args) for opcode, args in instructions]
 
-        if len(type_checker.type_errors) > 0:
-            print('Type errors:')
-            for e in type_checker.type_errors:
-                print(e)
-            exit(1)
+        yield chunk
 
-        visitor = MyVisitor()
-        instructions = visitor.visit(tree)
 
-        with open(Path(__file__).parent / 'bytecode.txt', 'w') as file:
-            file.writelines("\n".join(instructions))
+def write(chunks, files: list, binary=False):
+    if binary:
+        data = bytecode.encode([
+            instruction for chunk in chunks for instruction in bytecode.parse_text("\n".join(chunk))
+        ])
+        for file in files:
+            file.write(data)
+        return
+
+    separator = ''
+    for chunk in chunks:
+        if chunk:
+            data = (separator + "\n".join(chunk)).encode('utf-8')
+            for file in files:
+                file.write(data)
+            separator = "\n"
+
+
+def compile_source(contents: str, binary=False, passes=None, slots=False, typed=False, link=False,
+                   lines=False) -> bytes | None:
+    program = check(contents)
+    if program is None:
+        return None
+
+    output = io.BytesIO()
+    write(emit(program, passes, slots, typed, link, lines), [output], binary)
+    return output.getvalue()
+
+
+def open_output(output):
+    if output == '-':
+        return contextlib.nullcontext(sys.stdout.buffer)
+    return open(output, 'wb')
+
+
+def compile_file(path, output, binary=False, passes=None, slots=False, typed=False, link=False,
+                 lines=False) -> bool:
+    from mapped_input import MappedInputStream
+    from visitors import TypeChecker
+
+    temporary = output if output == '-' else Path('{}.{}.tmp'.format(output, os.getpid()))
+
+    def discard():
+        if temporary != output:
+            with contextlib.suppress(OSError):
+                os.remove(temporary)
+
+    type_checker = TypeChecker()
+    with MappedInputStream(path) as input_stream:
+        parser = statement_parser(input_stream)
+        try:
+            with open_output(temporary) as file:
+                nodes = check_statements(parse_statements(parser), type_checker)
+                write(assemble(emit_statements(nodes, type_checker, slots, typed, lines), passes, link), [file], binary)
+            if parser.getNumberOfSyntaxErrors() == 0:
+                report_type_errors(type_checker)
+        except BaseException:
+            discard()
+            raise
+
+    if parser.getNumberOfSyntaxErrors() != 0:
+        discard()
+        report_syntax_errors(path)
+        return False
+
+    if temporary != output:
+        os.replace(temporary, output)
+    return True
+
+
+def default_output(binary=False) -> Path:
+    return Path(__file__).parent / ('bytecode.bin' if binary else 'bytecode.txt')
+
+
+def cache_key(cache: CompileCache, contents: str, binary=False, passes=None, slots=False, typed=False, link=False,
+              lines=False) -> str:
+    return cache.key(contents, binary=binary, slots=slots, typed=typed, link=link, lines=lines, passes=[
+        (type(optimization_pass).__name__, optimization_pass.rules) for optimization_pass in passes or []
+    ])
+
+
+CODEGEN_OPTIONS = {
+    'binary': 'emit binary bytecode instead of text',
+    'slots': 'address variables by slot number and emit a symbol table',
+    'typed': 'emit type-specialized opcodes such as addi/addf',
+    'lines': 'record source line numbers for the profiler',
+    'link': 'resolve labels to absolute instruction offsets',
+}
+
+
+def add_compiler_arguments(arg_parser: argparse.ArgumentParser, options=tuple(CODEGEN_OPTIONS)):
+    for option in options:
+        arg_parser.add_argument('--' + option, action='store_true', help=CODEGEN_OPTIONS[option])
+    arg_parser.add_argument('-O', '--optimize', action='store_true',
+                            help='run constant folding and the peephole optimizer')
+    arg_parser.add_argument('--rules', help='comma separated optimization rules (default: all)')
+
+
+def optimization_rules(args) -> list | None:
+    return args.rules.split(',') if args.rules else None
+
+
+def optimization_passes(args) -> list:
+    return optimizer.create_passes(optimization_rules(args)) if args.optimize else []
+
+
+def argument_parser(**kwargs) -> argparse.ArgumentParser:
+    arg_parser = argparse.ArgumentParser(**kwargs)
+    arg_parser.add_argument('source', help='source code path')
+    arg_parser.add_argument('-o', '--output', help='bytecode output path, - for stdout')
+    add_compiler_arguments(arg_parser)
+    arg_parser.add_argument('--stream', action='store_true',
+                            help='memory-map the source and compile it one top-level statement at a time')
+    arg_parser.add_argument('--stats', action='store_true', help='report instructions removed by each rule')
+    arg_parser.add_argument('--no-cache', action='store_true', help='always recompile, bypassing the bytecode cache')
+    arg_parser.add_argument('--cache-dir', help='bytecode cache directory')
+    arg_parser.add_argument('--cache-size', type=int, default=CompileCache.DEFAULT_MAX_SIZE,
+                            help='bytecode cache size limit in bytes')
+    arg_parser.add_argument('--cache-stats', action='store_true', help='report bytecode cache hits and misses')
+    return arg_parser
+
+
+def main(path, output=None, binary=False, passes=None, slots=False, typed=False, link=False, lines=False,
+         cache: CompileCache | None = None, stream=False):
+    if output is None:
+        output = default_output(binary)
+
+    if stream:
+        return compile_file(path, output, binary, passes, slots, typed, link, lines)
+
+    with open(path, 'r') as file:
+        contents = file.read()
+
+    if cache is not None:
+        key = cache_key(cache, contents, binary, passes, slots, typed, link, lines)
+        cached = cache.reader(key)
+        if cached is not None:
+            with cached, open_output(output) as file:
+                shutil.copyfileobj(cached, file)
+            return True
+
+    program = check(contents)
+    del contents
+    if program is None:
+        return False
+
+    with contextlib.ExitStack() as stack:
+        files = [stack.enter_context(open_output(output))]
+        if cache is not None:
+            files.append(stack.enter_context(cache.writer(key)))
+        write(emit(program, passes, slots, typed, link, lines), files, binary)
+
+    return True
 
 
 if __name__ == '__main__':
-    if len(sys.argv) == 2:
-        main(sys.argv[1])
-    else:
-        print('No source code specified')
+    arg_parser = argument_parser()
+    args = arg_parser.parse_args()
+
+    passes = optimization_passes(args)
+
+    cache = None if args.no_cache or args.stats or args.stream else CompileCache(args.cache_dir, args.cache_size)
+    try:
+        main(args.source, args.output, args.binary, passes, args.slots, args.typed, args.link, args.lines, cache,
+             args.stream)
+    except bytecode.BytecodeError as e:
+        print('ERROR: {}'.format(e))
+        exit(1)
+
+    if args.stats:
+        for optimization_pass in passes:
+            print(optimization_pass.report())
+
+    if args.cache_stats and cache is not None:
+        print(cache.report())
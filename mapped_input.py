@@ -0,0 +1,127 @@
+import mmap
+
+from antlr4 import CommonTokenStream
+from antlr4.Token import Token
+
+
+def sequence_length(byte: int) -> int:
+    if byte < 0xC0:
+        return 1
+    elif byte < 0xE0:
+        return 2
+    elif byte < 0xF0:
+        return 3
+    return 4
+
+
+class MappedInputStream:
+    def __init__(self, path):
+        self.name = str(path)
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.data = b''
+        self._index = 0
+        self._size = len(self.data)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def reset(self):
+        self._index = 0
+
+    def code_point(self, position: int) -> int:
+        byte = self.data[position]
+        if byte < 0x80:
+            return byte
+        return ord(self.data[position:position + sequence_length(byte)].decode('utf-8'))
+
+    def consume(self):
+        if self._index >= self._size:
+            raise Exception('cannot consume EOF')
+        self._index += sequence_length(self.data[self._index])
+
+    def LA(self, offset: int) -> int:
+        position = self._index
+        if offset > 0:
+            for _ in range(offset - 1):
+                if position >= self._size:
+                    return Token.EOF
+                position += sequence_length(self.data[position])
+        elif offset < 0:
+            for _ in range(-offset):
+                position -= 1
+                while position > 0 and 0x80 <= self.data[position] < 0xC0:
+                    position -= 1
+                if position < 0:
+                    return Token.EOF
+        else:
+            return 0
+
+        if position >= self._size:
+            return Token.EOF
+        return self.code_point(position)
+
+    def LT(self, offset: int) -> int:
+        return self.LA(offset)
+
+    def mark(self) -> int:
+        return -1
+
+    def release(self, marker: int):
+        pass
+
+    def seek(self, index: int):
+        self._index = min(index, self._size)
+
+    def getText(self, start: int, stop: int) -> str:
+        if start >= self._size:
+            return ''
+        stop = min(stop, self._size - 1)
+        return self.data[start:stop + sequence_length(self.data[stop])].decode('utf-8')
+
+    def __str__(self) -> str:
+        return self.getText(0, self._size - 1)
+
+
+class StatementTokenStream(CommonTokenStream):
+    def __init__(self, lexer):
+        super().__init__(lexer)
+        self.offset = 0
+
+    def fetch(self, n: int) -> int:
+        fetched = super().fetch(n)
+        for token in self.tokens[len(self.tokens) - fetched:]:
+            token.tokenIndex += self.offset
+        return fetched
+
+    def discard(self):
+        consumed = self.index - 1
+        if consumed > 0:
+            del self.tokens[:consumed]
+            self.offset += consumed
+            self.index -= consumed
+
+    def getText(self, start=None, stop=None):
+        if isinstance(start, Token):
+            start = start.tokenIndex - self.offset
+        if isinstance(stop, Token):
+            stop = stop.tokenIndex - self.offset
+        return super().getText(start, stop)
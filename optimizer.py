@@ -0,0 +1,244 @@
+import bytecode
+from rope import Rope
+from virtual_machine import VirtualMachine
+
+
+class OptimizationPass:
+    RULES = []
+
+    def __init__(self, rules: list | None = None):
+        self.rules = self.RULES if rules is None else rules
+        for name in self.rules:
+            if name not in self.RULES:
+                raise ValueError('Unknown optimization rule {}'.format(name))
+
+        self.stats = {name: 0 for name in self.rules}
+
+    def optimize(self, instructions: list) -> list:
+        changed = True
+        while changed:
+            changed = False
+            for name in self.rules:
+                optimized = getattr(self, 'rule_' + name)(instructions)
+                if optimized != instructions:
+                    self.stats[name] += len(instructions) - len(optimized)
+                    instructions = optimized
+                    changed = True
+
+        return instructions
+
+    def report(self) -> str:
+        return '\n'.join('{}: {} removed'.format(name, removed) for name, removed in self.stats.items())
+
+    @staticmethod
+    def label_positions(instructions: list) -> dict:
+        return {args: i for i, (opcode, args) in enumerate(instructions) if opcode == 'label'}
+
+    @staticmethod
+    def jump_targets(instructions: list) -> set:
+        return {
+            target
+            for opcode, args in instructions if opcode != 'label'
+            for target in bytecode.operands_of_kind(opcode, args, 'label')
+        }
+
+
+class PeepholeOptimizer(OptimizationPass):
+    RULES = ['save_load_pop', 'eq_not', 'thread_jumps', 'jump_to_next', 'dead_labels']
+
+    def rule_save_load_pop(self, instructions: list) -> list:
+        result = []
+        i = 0
+        while i < len(instructions):
+            window = instructions[i:i + 3]
+            if len(window) == 3 and window[0][0] == 'save' and window[1] == ('load', window[0][1]) \
+                    and window[2][0] == 'pop':
+                result.append(window[0])
+                i += 3
+            else:
+                result.append(instructions[i])
+                i += 1
+
+        return result
+
+    def rule_eq_not(self, instructions: list) -> list:
+        result = []
+        for instruction in instructions:
+            if instruction[0] == 'not' and len(result) > 0 and result[-1][0].startswith('eq'):
+                result[-1] = ('n' + result[-1][0], None)
+            else:
+                result.append(instruction)
+
+        return result
+
+    def rule_thread_jumps(self, instructions: list) -> list:
+        positions = self.label_positions(instructions)
+
+        def final_target(label):
+            visited = set()
+            while label not in visited:
+                visited.add(label)
+                i = positions[label]
+                while i < len(instructions) and instructions[i][0] == 'label':
+                    i += 1
+                if i == len(instructions) or instructions[i][0] != 'jmp':
+                    break
+                label = instructions[i][1]
+
+            return label
+
+        result = []
+        for opcode, args in instructions:
+            if (opcode == 'jmp' or opcode == 'fjmp') and args in positions:
+                args = final_target(args)
+            result.append((opcode, args))
+
+        return result
+
+    def rule_jump_to_next(self, instructions: list) -> list:
+        result = []
+        for i, (opcode, args) in enumerate(instructions):
+            if opcode == 'jmp':
+                j = i + 1
+                while j < len(instructions) and instructions[j][0] == 'label':
+                    if instructions[j][1] == args:
+                        break
+                    j += 1
+                if j < len(instructions) and instructions[j] == ('label', args):
+                    continue
+
+            result.append((opcode, args))
+
+        return result
+
+    def rule_dead_labels(self, instructions: list) -> list:
+        targets = self.jump_targets(instructions)
+
+        return [(opcode, args) for opcode, args in instructions if opcode != 'label' or args in targets]
+
+
+class ConstantFolder(OptimizationPass):
+    RULES = ['fold_constants', 'constant_branches', 'unreachable_code']
+
+    OPERATIONS = {
+        'add': 2, 'sub': 2, 'mul': 2, 'div': 2, 'mod': 2, 'concat': 2,
+        'and': 2, 'or': 2, 'gt': 2, 'lt': 2, 'eq': 2, 'neq': 2,
+        'uminus': 1, 'not': 1, 'itof': 1,
+        'addi': 2, 'addf': 2, 'subi': 2, 'subf': 2, 'muli': 2, 'mulf': 2, 'divi': 2, 'divf': 2, 'modi': 2,
+        'lti': 2, 'ltf': 2, 'gti': 2, 'gtf': 2,
+        'eqi': 2, 'eqf': 2, 'eqs': 2, 'eqb': 2, 'neqi': 2, 'neqf': 2, 'neqs': 2, 'neqb': 2,
+    }
+
+    INT_RANGE = range(-2 ** 63, 2 ** 63)
+
+    def __init__(self, rules: list | None = None):
+        super().__init__(rules)
+        self.machine = VirtualMachine([])
+
+    def evaluate(self, opcode: str, operands: list):
+        self.machine.stack = list(operands)
+        try:
+            self.machine.exec_methods[opcode](None)
+        except ArithmeticError:
+            return None
+
+        value = self.machine.stack.pop()
+        if type(value) is int and value not in self.INT_RANGE:
+            return None
+        if type(value) is Rope:
+            return str(value)
+
+        return value
+
+    def rule_fold_constants(self, instructions: list) -> list:
+        result = []
+        for opcode, args in instructions:
+            arity = self.OPERATIONS.get(opcode)
+            if arity is not None and len(result) >= arity \
+                    and all(instruction[0] == 'push' for instruction in result[-arity:]):
+                value = self.evaluate(opcode, [instruction[1] for instruction in result[-arity:]])
+                if value is not None:
+                    del result[-arity:]
+                    result.append(('push', value))
+                    continue
+
+            result.append((opcode, args))
+
+        return result
+
+    def rule_constant_branches(self, instructions: list) -> list:
+        result = []
+        for opcode, args in instructions:
+            if opcode == 'fjmp' and len(result) > 0 and result[-1][0] == 'push':
+                condition = result.pop()[1]
+                if not condition:
+                    result.append(('jmp', args))
+            else:
+                result.append((opcode, args))
+
+        return result
+
+    def rule_unreachable_code(self, instructions: list) -> list:
+        targets = self.jump_targets(instructions)
+
+        result = []
+        reachable = True
+        for opcode, args in instructions:
+            if opcode == 'label' and args in targets:
+                reachable = True
+
+            if reachable:
+                result.append((opcode, args))
+
+            if opcode == 'jmp':
+                reachable = False
+
+        return result
+
+
+class SuperinstructionFuser(OptimizationPass):
+    RULES = ['superinstructions']
+
+    PATTERNS = {
+        tuple(components): name
+        for name, (family, opcode, components) in bytecode.SUPERINSTRUCTIONS.items()
+    }
+    PATTERN_LENGTHS = sorted({len(pattern) for pattern in PATTERNS}, reverse=True)
+
+    def rule_superinstructions(self, instructions: list) -> list:
+        result = []
+        i = 0
+        while i < len(instructions):
+            for length in self.PATTERN_LENGTHS:
+                window = instructions[i:i + length]
+                name = self.PATTERNS.get(tuple(opcode for opcode, args in window))
+                if name is not None:
+                    operands = [args for opcode, args in window if bytecode.OPERAND_KINDS.get(opcode) != 'const'
+                                and opcode in bytecode.OPERAND_KINDS]
+                    operands += [args for opcode, args in window if bytecode.OPERAND_KINDS.get(opcode) == 'const']
+                    result.append((name, tuple(operands)))
+                    i += length
+                    break
+            else:
+                result.append(instructions[i])
+                i += 1
+
+        return result
+
+
+PASSES = [ConstantFolder, PeepholeOptimizer, SuperinstructionFuser]
+
+
+def create_passes(rules: list | None = None) -> list:
+    if rules is None:
+        return [optimization_pass() for optimization_pass in PASSES]
+
+    for name in rules:
+        if not any(name in optimization_pass.RULES for optimization_pass in PASSES):
+            raise ValueError('Unknown optimization rule {}'.format(name))
+
+    return [
+        optimization_pass([name for name in rules if name in optimization_pass.RULES])
+        for optimization_pass in PASSES
+        if any(name in optimization_pass.RULES for name in rules)
+    ]
@@ -0,0 +1,117 @@
+import json
+import time
+
+import assembler
+import bytecode
+from virtual_machine import VirtualMachine
+
+
+class ProfilingVirtualMachine(VirtualMachine):
+    def decode(self):
+        super().decode()
+
+        self.code = []
+        self.source_lines = []
+        line = None
+        for opcode, args in assembler.link(self.instructions):
+            if opcode == 'line':
+                line = args
+            elif opcode not in bytecode.DIRECTIVES:
+                self.code.append((opcode, args))
+                self.source_lines.append(line)
+
+        self.counts = [0] * len(self.program)
+        self.times = [0] * len(self.program)
+
+    def interpret(self):
+        program = self.program
+        program_length = len(program)
+        counts = self.counts
+        times = self.times
+        clock = time.perf_counter_ns
+
+        while self.current_line < program_length:
+            address = self.current_line
+            method, instruction_args = program[address]
+            self.current_line = address + 1
+            start = clock()
+            method(instruction_args)
+            times[address] += clock() - start
+            counts[address] += 1
+
+    def loops(self) -> list:
+        loops = []
+        for address, (opcode, args) in enumerate(self.code):
+            if opcode == 'jmp' and args <= address and self.counts[address] > 0:
+                loops.append({
+                    'start': args,
+                    'end': address,
+                    'lines': [self.source_lines[args], self.source_lines[address]],
+                    'iterations': self.counts[address],
+                    'instructions': sum(self.counts[args:address + 1]),
+                    'time': sum(self.times[args:address + 1]) / 1e9,
+                })
+
+        return sorted(loops, key=lambda loop: loop['time'], reverse=True)
+
+    def report(self) -> dict:
+        opcodes = {}
+        addresses = []
+        for address, (opcode, args) in enumerate(self.code):
+            count = self.counts[address]
+            if count == 0:
+                continue
+
+            seconds = self.times[address] / 1e9
+            totals = opcodes.setdefault(opcode, {'opcode': opcode, 'count': 0, 'time': 0.0})
+            totals['count'] += count
+            totals['time'] += seconds
+            addresses.append({
+                'address': address,
+                'opcode': opcode,
+                'line': self.source_lines[address],
+                'count': count,
+                'time': seconds,
+            })
+
+        return {
+            'instructions': sum(self.counts),
+            'time': sum(self.times) / 1e9,
+            'opcodes': sorted(opcodes.values(), key=lambda totals: totals['time'], reverse=True),
+            'addresses': addresses,
+            'loops': self.loops(),
+        }
+
+
+def share(seconds: float, total: float) -> float:
+    return 100 * seconds / total if total > 0 else 0.0
+
+
+def format_report(report: dict, top: int = 10) -> str:
+    total = report['time']
+    lines = ['{} instructions in {:.3f}s'.format(report['instructions'], total), '', 'opcodes:']
+    for totals in report['opcodes'][:top]:
+        lines.append('  {:<24} {:>10} {:>9.3f}s {:>5.1f}%'.format(
+            totals['opcode'], totals['count'], totals['time'], share(totals['time'], total)
+        ))
+
+    lines += ['', 'instructions:']
+    for entry in sorted(report['addresses'], key=lambda entry: entry['time'], reverse=True)[:top]:
+        lines.append('  {:>6} {:<24} line {:<6} {:>10} {:>9.3f}s {:>5.1f}%'.format(
+            entry['address'], entry['opcode'], '?' if entry['line'] is None else entry['line'],
+            entry['count'], entry['time'], share(entry['time'], total)
+        ))
+
+    lines += ['', 'loops:']
+    for loop in report['loops'][:top]:
+        first, last = ('?' if line is None else line for line in loop['lines'])
+        lines.append('  {:>6}-{:<6} lines {}-{:<6} {:>10} iterations {:>9.3f}s {:>5.1f}%'.format(
+            loop['start'], loop['end'], first, last, loop['iterations'], loop['time'], share(loop['time'], total)
+        ))
+
+    return '\n'.join(lines)
+
+
+def write_json(report: dict, path):
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
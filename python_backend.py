@@ -0,0 +1,535 @@
+import argparse
+import collections
+import hashlib
+import marshal
+import math
+import sys
+from pathlib import Path
+
+import assembler
+import bytecode
+from bytecode import BytecodeError
+from rope import concat
+from streams import InputReader, OutputBuffer
+from virtual_machine import divide
+
+BACKEND_VERSION = 4
+
+BINARY_TEMPLATES = {
+    'add': '({} + {})',
+    'sub': '({} - {})',
+    'mul': '({} * {})',
+    'div': 'divide({}, {})',
+    'mod': '({} % {})',
+    'concat': 'concat({}, {})',
+    'and': '({} and {})',
+    'or': '({} or {})',
+    'gt': '({} > {})',
+    'lt': '({} < {})',
+    'eq': '({} == {})',
+    'neq': '({} != {})',
+    'addi': '({} + {})',
+    'addf': '({} + {})',
+    'subi': '({} - {})',
+    'subf': '({} - {})',
+    'muli': '({} * {})',
+    'mulf': '({} * {})',
+    'divi': '({} // {})',
+    'divf': '({} / {})',
+    'modi': '({} % {})',
+    'lti': '({} < {})',
+    'ltf': '({} < {})',
+    'gti': '({} > {})',
+    'gtf': '({} > {})',
+    'eqi': '({} == {})',
+    'eqf': '({} == {})',
+    'eqs': '({} == {})',
+    'eqb': '({} == {})',
+    'neqi': '({} != {})',
+    'neqf': '({} != {})',
+    'neqs': '({} != {})',
+    'neqb': '({} != {})',
+}
+
+UNARY_TEMPLATES = {
+    'uminus': '(-{})',
+    'not': '(not {})',
+    'itof': 'float({})',
+}
+
+READ_TEMPLATES = {
+    'I': 'int(readline())',
+    'F': 'float(readline())',
+    'S': 'str(readline())',
+    'B': "(readline() == 'true')",
+}
+
+
+class StructureError(Exception):
+    pass
+
+
+def constant(value) -> str:
+    if type(value) is float and not math.isfinite(value):
+        return "float('{}')".format(value)
+    return repr(value)
+
+
+class Translator:
+    def __init__(self, instructions: list):
+        self.symbols = {}
+        self.code = []
+        for opcode, args in assembler.unlink(instructions):
+            if opcode == 'var':
+                self.symbols[args[0]] = args[1]
+            elif opcode not in bytecode.DIRECTIVES:
+                self.code.extend(bytecode.expand(opcode, args))
+
+        self.labels = {args: i for i, (opcode, args) in enumerate(self.code) if opcode == 'label'}
+        self.jump_counts = collections.Counter(
+            args for opcode, args in self.code if opcode == 'jmp' or opcode == 'fjmp'
+        )
+        self.variables = {}
+        self.lines = []
+        self.indent = 1
+        self.temp_count = 0
+        self.stack = []
+        self.handled_jumps = set()
+
+    def variable(self, operand) -> str:
+        if operand not in self.variables:
+            name = self.symbols.get(operand, operand)
+            self.variables[operand] = 'v_{}'.format(name) if type(name) is str else 'v{}'.format(name)
+        return self.variables[operand]
+
+    def emit(self, line: str):
+        self.lines.append('    ' * self.indent + line)
+
+    def temp(self, expression: str) -> str:
+        name = 't{}'.format(self.temp_count)
+        self.temp_count += 1
+        self.emit('{} = {}'.format(name, expression))
+        return name
+
+    def translate(self) -> str:
+        try:
+            self.region(0, len(self.code), set(), None)
+            jumps = {i for i, (opcode, args) in enumerate(self.code) if opcode == 'jmp' or opcode == 'fjmp'}
+            if jumps != self.handled_jumps or self.stack:
+                raise StructureError('Unstructured control flow')
+            body = self.lines
+        except StructureError:
+            body = self.dispatch()
+
+        header = ['def program():']
+        if self.variables:
+            header.append('    {} = None'.format(' = '.join(self.variables.values())))
+        return '\n'.join(header + body + ['    return None']) + '\n'
+
+    def straight(self, opcode: str, args, statements: bool = True):
+        if opcode == 'push':
+            self.stack.append((constant(args), set()))
+        elif opcode == 'load':
+            self.stack.append((self.variable(args), {args}))
+        elif opcode in BINARY_TEMPLATES:
+            right, right_uses = self.pop()
+            left, left_uses = self.pop()
+            self.stack.append((BINARY_TEMPLATES[opcode].format(left, right), left_uses | right_uses))
+        elif opcode in UNARY_TEMPLATES:
+            value, uses = self.pop()
+            self.stack.append((UNARY_TEMPLATES[opcode].format(value), uses))
+        elif not statements:
+            raise StructureError('Statement inside expression')
+        elif opcode == 'save':
+            value, uses = self.pop()
+            self.stack = [
+                (self.temp(expression), set()) if args in expression_uses else (expression, expression_uses)
+                for expression, expression_uses in self.stack
+            ]
+            self.emit('{} = {}'.format(self.variable(args), value))
+        elif opcode == 'pop':
+            self.pop()
+        elif opcode == 'print':
+            values = [self.pop()[0] for _ in range(args)]
+            values.reverse()
+            arguments = ''.join(value + ', ' for value in values)
+            self.emit("write('{}\\n' % ({}))".format(' '.join(['%s'] * args), arguments))
+        elif opcode == 'read':
+            self.stack.append((self.temp(READ_TEMPLATES[args]), set()))
+        else:
+            raise StructureError('Unexpected {}'.format(opcode))
+
+    def pop(self):
+        if not self.stack:
+            raise StructureError('Stack underflow')
+        return self.stack.pop()
+
+    def snapshot(self) -> tuple:
+        return list(self.stack), len(self.lines), set(self.handled_jumps), self.temp_count, self.indent
+
+    def restore(self, state: tuple):
+        stack, count, handled_jumps, self.temp_count, self.indent = state
+        self.stack = list(stack)
+        self.handled_jumps = set(handled_jumps)
+        del self.lines[count:]
+
+    def follow(self, index: int, end: int, follow: set) -> set:
+        labels = set()
+        while index < end and self.code[index][0] == 'label':
+            labels.add(self.code[index][1])
+            index += 1
+        return labels | follow if index >= end else labels
+
+    def loop_end(self, label, start: int, end: int):
+        for k in range(end - 1, start, -1):
+            if self.code[k] == ('jmp', label):
+                return k
+        return None
+
+    def jump(self, index: int, label, follow: set, loop: tuple | None) -> str | None:
+        self.handled_jumps.add(index)
+        if loop is not None and label == loop[0]:
+            return 'continue'
+        elif loop is not None and label in loop[1]:
+            return 'break'
+        elif label in follow:
+            return None
+        raise StructureError('Unstructured jump')
+
+    def block(self, start: int, end: int, follow: set, loop: tuple | None):
+        self.indent += 1
+        count = len(self.lines)
+        self.region(start, end, follow, loop)
+        if self.stack:
+            raise StructureError('Stack not empty at block end')
+        if len(self.lines) == count:
+            self.emit('pass')
+        self.indent -= 1
+
+    def region(self, start: int, end: int, follow: set, loop: tuple | None):
+        i = start
+        while i < end:
+            opcode, args = self.code[i]
+
+            if opcode == 'label':
+                if self.stack:
+                    raise StructureError('Stack not empty at label')
+                k = self.loop_end(args, i, end)
+                i = i + 1 if k is None else self.loop(i, k, end, follow)
+            elif opcode == 'fjmp':
+                i = self.branch(i, end, follow, loop)
+            elif opcode == 'jmp':
+                if self.stack:
+                    raise StructureError('Stack not empty at jump')
+                statement = self.jump(i, args, follow, loop)
+                if statement is not None:
+                    self.emit(statement)
+                for j in range(i + 1, end):
+                    if self.code[j][0] == 'label' and self.references(self.code[j][1]):
+                        raise StructureError('Jump over reachable code')
+                i = end
+            else:
+                self.straight(opcode, args)
+                i += 1
+
+    def references(self, label) -> bool:
+        return self.jump_counts[label] > 0
+
+    def condition(self, i: int, end: int) -> tuple:
+        depth = len(self.stack)
+        while i < end and self.code[i][0] not in ('label', 'jmp'):
+            opcode, args = self.code[i]
+            if opcode == 'fjmp':
+                state = self.snapshot()
+                try:
+                    self.handled_jumps.add(i)
+                    i = self.conditional_expression(self.pop()[0], i + 1, self.labels.get(args, -1), end)
+                except StructureError:
+                    self.restore(state)
+                    break
+            else:
+                self.straight(opcode, args, statements=False)
+                i += 1
+        if i >= end or self.code[i][0] != 'fjmp' or len(self.stack) != depth + 1:
+            raise StructureError('Not a condition')
+
+        self.handled_jumps.add(i)
+        return self.compound(self.pop()[0], i + 1, self.code[i][1], 1, end)
+
+    def compound(self, condition: str, i: int, target, count: int, end: int) -> tuple:
+        while i < end:
+            opcode, args = self.code[i]
+            state = self.snapshot()
+            try:
+                if opcode == 'jmp':
+                    if (i + 1 >= end or self.code[i + 1] != ('label', target)
+                            or self.jump_counts[target] != count or self.jump_counts[args] != 1):
+                        break
+                    right, j, target, count = self.condition(i + 2, end)
+                    if j >= end or self.code[j] != ('label', args):
+                        raise StructureError('Unstructured condition')
+                    self.handled_jumps.add(i)
+                    condition = '({} or {})'.format(condition, right)
+                    i = j + 1
+                elif opcode != 'label':
+                    right, j, right_target, right_count = self.condition(i, end)
+                    if right_target != target:
+                        raise StructureError('Different branch target')
+                    condition = '({} and {})'.format(condition, right)
+                    i, count = j, count + right_count
+                else:
+                    break
+            except StructureError:
+                self.restore(state)
+                break
+
+        return condition, i, target, count
+
+    def loop(self, start: int, k: int, end: int, follow: set) -> int:
+        head = self.code[start][1]
+        exits = self.follow(k + 1, end, follow)
+        self.handled_jumps.add(k)
+
+        f = start + 1
+        while f < k and self.code[f][0] not in ('label', 'jmp', 'fjmp'):
+            f += 1
+
+        condition = None
+        if f < k and self.code[f][0] == 'fjmp':
+            state = self.snapshot()
+            count = len(self.lines)
+            try:
+                self.indent += 1
+                for opcode, args in self.code[start + 1:f]:
+                    self.straight(opcode, args)
+                condition = self.pop()[0]
+                if self.stack:
+                    raise StructureError('Stack not empty at loop condition')
+                self.indent -= 1
+                self.handled_jumps.add(f)
+                condition, body, target, uses = self.compound(condition, f + 1, self.code[f][1], 1, k)
+                if target not in exits:
+                    raise StructureError('Loop condition does not exit')
+            except StructureError:
+                self.restore(state)
+                condition = None
+
+        if condition is not None:
+            if len(self.lines) == count:
+                self.emit('while {}:'.format(condition))
+            else:
+                self.lines.insert(count, '    ' * self.indent + 'while True:')
+                self.indent += 1
+                self.emit('if not {}:'.format(condition))
+                self.emit('    break')
+                self.indent -= 1
+            self.block(body, k, {head}, (head, exits))
+        else:
+            self.emit('while True:')
+            self.block(start + 1, k, {head}, (head, exits))
+
+        return k + 1
+
+    def branch(self, f: int, end: int, follow: set, loop: tuple | None) -> int:
+        condition = self.pop()[0]
+        self.handled_jumps.add(f)
+        condition, start, target, count = self.compound(condition, f + 1, self.code[f][1], 1, end)
+
+        e = self.labels.get(target)
+        if e is None or e < start:
+            raise StructureError('Backward conditional jump')
+
+        if e >= end:
+            if self.stack:
+                raise StructureError('Stack not empty at branch')
+            statement = self.jump(f, target, follow, loop)
+            if statement is not None:
+                self.emit('if not {}:'.format(condition))
+                self.emit('    ' + statement)
+                return start
+            self.emit('if {}:'.format(condition))
+            self.block(start, end, follow, loop)
+            return end
+
+        if self.stack:
+            return self.conditional_expression(condition, start, e, end)
+
+        state = self.snapshot()
+        try:
+            return self.conditional_expression(condition, start, e, end)
+        except StructureError:
+            self.restore(state)
+
+        then_end = e
+        else_region = None
+        last_opcode, last_label = self.code[e - 1]
+        if e - 1 >= start and last_opcode == 'jmp':
+            j = self.labels.get(last_label)
+            if j is not None and e < j < end:
+                then_end = e - 1
+                else_region = (e + 1, j, self.follow(j, end, follow))
+                self.handled_jumps.add(e - 1)
+            elif last_label in follow and (loop is None or last_label != loop[0]):
+                then_end = e - 1
+                else_region = (e + 1, end, follow)
+                self.handled_jumps.add(e - 1)
+
+        self.emit('if {}:'.format(condition))
+        self.block(start, then_end, self.follow(e, end, follow) if else_region is None else else_region[2], loop)
+        if else_region is None:
+            return e
+
+        self.emit('else:')
+        self.block(*else_region, loop)
+        return else_region[1]
+
+    def conditional_expression(self, condition: str, start: int, e: int, end: int) -> int:
+        if not start < e < end:
+            raise StructureError('Unstructured conditional expression')
+
+        last_opcode, last_label = self.code[e - 1]
+        j = self.labels.get(last_label) if last_opcode == 'jmp' else None
+        if j is None or not e < j < end or self.jump_counts[last_label] != 1:
+            raise StructureError('Unstructured conditional expression')
+
+        below = self.stack
+        self.stack = []
+        then_value = self.expression(start, e - 1)
+        else_value = self.expression(e + 1, j)
+        self.stack = below
+        self.handled_jumps.add(e - 1)
+
+        self.stack.append(('({} if {} else {})'.format(then_value[0], condition, else_value[0]),
+                           then_value[1] | else_value[1]))
+        return j + 1
+
+    def expression(self, start: int, end: int):
+        count = len(self.lines)
+        i = start
+        while i < end:
+            opcode, args = self.code[i]
+            if opcode == 'fjmp':
+                condition = self.pop()[0]
+                self.handled_jumps.add(i)
+                e = self.labels.get(args)
+                if e is None or not i < e < end:
+                    raise StructureError('Unstructured conditional expression')
+                i = self.conditional_expression(condition, i + 1, e, end)
+            elif opcode == 'label':
+                i += 1
+            else:
+                self.straight(opcode, args, statements=False)
+                i += 1
+
+        if len(self.lines) != count or len(self.stack) != 1:
+            raise StructureError('Branch is not an expression')
+        return self.stack.pop()
+
+    def dispatch(self) -> list:
+        self.lines = []
+        starts = sorted({0} | set(self.labels.values()) | {
+            i + 1 for i, (opcode, args) in enumerate(self.code) if opcode in ('jmp', 'fjmp')
+        })
+        blocks = {start: n for n, start in enumerate(starts)}
+        label_blocks = {label: blocks[i] for label, i in self.labels.items()}
+
+        self.indent = 1
+        self.emit('stack = []')
+        self.emit('pc = 0')
+        self.emit('while True:')
+        for n, start in enumerate(starts):
+            end = starts[n + 1] if n + 1 < len(starts) else len(self.code)
+            self.indent = 2
+            self.emit('{} pc == {}:'.format('if' if n == 0 else 'elif', n))
+            self.indent = 3
+            next_block = n + 1 if end < len(self.code) else -1
+
+            for opcode, args in self.code[start:end]:
+                if opcode == 'label':
+                    continue
+                elif opcode == 'jmp':
+                    next_block = label_blocks[args]
+                elif opcode == 'fjmp':
+                    self.emit('if not stack.pop():')
+                    self.emit('    pc = {}'.format(label_blocks[args]))
+                    self.emit('    continue')
+                elif opcode == 'push':
+                    self.emit('stack.append({})'.format(constant(args)))
+                elif opcode == 'load':
+                    self.emit('stack.append({})'.format(self.variable(args)))
+                elif opcode == 'save':
+                    self.emit('{} = stack.pop()'.format(self.variable(args)))
+                elif opcode == 'pop':
+                    self.emit('stack.pop()')
+                elif opcode in BINARY_TEMPLATES:
+                    self.emit('right = stack.pop()')
+                    self.emit('stack[-1] = {}'.format(BINARY_TEMPLATES[opcode].format('stack[-1]', 'right')))
+                elif opcode in UNARY_TEMPLATES:
+                    self.emit('stack[-1] = {}'.format(UNARY_TEMPLATES[opcode].format('stack[-1]')))
+                elif opcode == 'print':
+                    self.emit('values = stack[len(stack) - {}:]'.format(args))
+                    self.emit('del stack[len(stack) - {}:]'.format(args))
+                    self.emit("write(' '.join(map(str, values)) + '\\n')")
+                elif opcode == 'read':
+                    self.emit('stack.append({})'.format(READ_TEMPLATES[args]))
+
+            self.emit('pc = {}'.format(next_block))
+        self.indent = 2
+        self.emit('else:')
+        self.emit('    break')
+        return self.lines
+
+
+class PythonBackend:
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(__file__).parent / '__pycache__' / 'pjp' if cache_dir is None else Path(cache_dir)
+        self.code_objects = {}
+
+    @staticmethod
+    def translate(instructions: list) -> str:
+        return Translator(instructions).translate()
+
+    @staticmethod
+    def cache_key(instructions: list) -> str:
+        key = '{}\n{}\n{}'.format(BACKEND_VERSION, sys.version, bytecode.format_text(instructions))
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def compile(self, instructions: list):
+        key = self.cache_key(instructions)
+        if key in self.code_objects:
+            return self.code_objects[key]
+
+        path = self.cache_dir / '{}.marshal'.format(key)
+        if path.exists():
+            with open(path, 'rb') as file:
+                code = marshal.load(file)
+        else:
+            code = compile(self.translate(instructions), '<pjp {}>'.format(key[:12]), 'exec')
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(path, 'wb') as file:
+                marshal.dump(code, file)
+
+        self.code_objects[key] = code
+        return code
+
+    def execute(self, instructions: list, stdin=None, stdout=None, buffer_size: int = OutputBuffer.DEFAULT_SIZE):
+        output = OutputBuffer(stdout, buffer_size)
+        reader = InputReader(stdin, output)
+        namespace = {'divide': divide, 'concat': concat, 'write': output.write, 'readline': reader.readline}
+        exec(self.compile(instructions), namespace)
+        try:
+            namespace['program']()
+        finally:
+            output.flush()
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Translate bytecode to Python source')
+    arg_parser.add_argument('bytecode', help='bytecode path (text or binary)')
+    args = arg_parser.parse_args()
+
+    try:
+        print(PythonBackend.translate(bytecode.load(args.bytecode)))
+    except BytecodeError as e:
+        print('ERROR: {}'.format(e))
+        exit(1)
@@ -0,0 +1,111 @@
+import argparse
+import sys
+
+import incremental
+import main
+from virtual_machine import VirtualMachine
+
+
+class Session:
+    def __init__(self, stdin=None, stdout=None, passes=None, typed=False):
+        self.compiler = incremental.IncrementalCompiler(passes, typed=typed)
+        self.env = {}
+        self.vm = VirtualMachine([], stdin, stdout)
+
+    def compile(self, source: str) -> list | None:
+        env = dict(self.env)
+        units = []
+        type_errors = []
+        for text, line, column in incremental.statements(source):
+            try:
+                unit = self.compiler.compile_statement(text, line, column, env)
+            except LookupError as e:
+                type_errors.append('{} was not declared'.format(e.args[0]))
+                continue
+
+            if unit is None:
+                main.parse(source)
+                return None
+            self.compiler.declare(unit, env)
+            type_errors += unit.type_errors
+            units.append(unit)
+
+        if type_errors:
+            print('Type errors:')
+            for e in type_errors:
+                print(e)
+            return None
+
+        self.env = env
+        return self.compiler.assemble(units, env)
+
+    def execute(self, source: str) -> bool:
+        instructions = self.compile(source)
+        if instructions is None:
+            return False
+
+        try:
+            self.vm.load(instructions)
+            self.vm.execute()
+        except SystemExit:
+            return False
+        except Exception as e:
+            print('ERROR: {}: {}'.format(type(e).__name__, e))
+            return False
+        return True
+
+    def variables(self) -> list:
+        values = self.vm.vars
+        return ['{} {} = {!r}'.format(var['type'], name, values.get(name)) for name, var in self.env.items()]
+
+    def prompt(self, text: str):
+        self.vm.output.write(text)
+        self.vm.output.flush()
+
+    def interact(self, interactive=False):
+        pending = []
+        while True:
+            if interactive:
+                self.prompt('... ' if pending else '>>> ')
+            try:
+                line = self.vm.input.readline()
+            except EOFError:
+                break
+
+            if not pending and line.strip() == ':vars':
+                for variable in self.variables():
+                    print(variable)
+                continue
+
+            pending.append(line)
+            source = "\n".join(pending)
+            if line.strip() and not incremental.split(source)[1]:
+                continue
+
+            pending = []
+            if source.strip():
+                self.execute(source)
+
+        if pending:
+            self.execute("\n".join(pending))
+        if interactive:
+            self.prompt('\n')
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Interactive PJP session that keeps variables between inputs')
+    arg_parser.add_argument('source', nargs='?', help='source code to run before reading input')
+    main.add_compiler_arguments(arg_parser, ['typed'])
+    args = arg_parser.parse_args()
+
+    passes = main.optimization_passes(args)
+    session = Session(passes=passes, typed=args.typed)
+    if args.source is not None:
+        with open(args.source, 'r') as file:
+            if not session.execute(file.read()):
+                exit(1)
+
+    try:
+        session.interact(sys.stdin.isatty())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,57 @@
+class Rope:
+    TAIL_SIZE = 256
+
+    __slots__ = ('parts', 'count', 'tail')
+
+    def __init__(self, parts: list, count: int, tail: str):
+        self.parts = parts
+        self.count = count
+        self.tail = tail
+
+    def append(self, text: str) -> 'Rope':
+        if len(self.tail) + len(text) <= self.TAIL_SIZE:
+            return Rope(self.parts, self.count, self.tail + text)
+
+        parts = self.parts if len(self.parts) == self.count else self.parts[:self.count]
+        parts.append(self.tail)
+        return Rope(parts, self.count + 1, text)
+
+    def __str__(self) -> str:
+        if self.count != 1 or self.tail:
+            parts = self.parts if len(self.parts) == self.count else self.parts[:self.count]
+            self.parts = [''.join(parts) + self.tail]
+            self.count = 1
+            self.tail = ''
+        return self.parts[0]
+
+    def __repr__(self) -> str:
+        return 'Rope({!r})'.format(str(self))
+
+    def __len__(self) -> int:
+        return len(str(self))
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __eq__(self, other) -> bool:
+        return str(self) == str(other) if isinstance(other, (str, Rope)) else NotImplemented
+
+    def __ne__(self, other) -> bool:
+        return str(self) != str(other) if isinstance(other, (str, Rope)) else NotImplemented
+
+    def __lt__(self, other) -> bool:
+        return str(self) < str(other) if isinstance(other, (str, Rope)) else NotImplemented
+
+    def __gt__(self, other) -> bool:
+        return str(self) > str(other) if isinstance(other, (str, Rope)) else NotImplemented
+
+
+def concat(left, right):
+    if type(right) is Rope:
+        right = str(right)
+
+    if type(left) is Rope:
+        return left.append(right)
+    elif len(left) + len(right) <= Rope.TAIL_SIZE:
+        return left + right
+    return Rope([left], 1, right)
@@ -0,0 +1,139 @@
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from virtual_machine import VirtualMachine
+
+PROGRAMS = {}
+
+
+def load_program(path) -> VirtualMachine:
+    stat = os.stat(path)
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    if key not in PROGRAMS:
+        PROGRAMS[key] = VirtualMachine.from_file(path, stdout=io.StringIO())
+    return PROGRAMS[key]
+
+
+def run_job(job: tuple) -> dict:
+    program, input_path = job
+    start = time.perf_counter()
+    stdout = io.StringIO()
+    messages = io.StringIO()
+    status = 0
+    error = None
+
+    try:
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(contextlib.redirect_stdout(messages))
+            vm = load_program(program)
+            stdin = io.StringIO('') if input_path is None else stack.enter_context(open(input_path, 'r'))
+            vm.reset(stdin, stdout)
+            vm.execute()
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else 1
+        error = messages.getvalue().strip()
+    except Exception as e:
+        status = 1
+        error = '{}: {}'.format(type(e).__name__, e)
+
+    return {
+        'program': str(program),
+        'input': None if input_path is None else str(input_path),
+        'status': status,
+        'output': stdout.getvalue(),
+        'error': error,
+        'latency': time.perf_counter() - start,
+    }
+
+
+def run_jobs(jobs: list, workers: int | None = None) -> list:
+    if workers == 1:
+        return list(map(run_job, jobs))
+
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def read_jobs(path) -> list:
+    jobs = []
+    with open(path, 'r') as file:
+        for line in file:
+            fields = line.split()
+            if fields:
+                jobs.append((fields[0], fields[1] if len(fields) > 1 else None))
+    return jobs
+
+
+def summary(results: list, elapsed: float) -> dict:
+    latencies = sorted(result['latency'] for result in results)
+    return {
+        'jobs': len(results),
+        'failed': sum(1 for result in results if result['status'] != 0),
+        'time': elapsed,
+        'jobs_per_second': len(results) / elapsed if elapsed > 0 else 0.0,
+        'latency_mean': statistics.mean(latencies) if latencies else 0.0,
+        'latency_p50': latencies[len(latencies) // 2] if latencies else 0.0,
+        'latency_p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+        'latency_max': latencies[-1] if latencies else 0.0,
+    }
+
+
+def format_summary(report: dict) -> str:
+    return ('{jobs} jobs ({failed} failed) in {time:.3f}s, {jobs_per_second:.1f} jobs/s\n'
+            'latency: mean {mean:.2f}ms, p50 {p50:.2f}ms, p95 {p95:.2f}ms, max {max:.2f}ms').format(
+        mean=1000 * report['latency_mean'], p50=1000 * report['latency_p50'], p95=1000 * report['latency_p95'],
+        max=1000 * report['latency_max'], **report
+    )
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Run compiled PJP programs against many inputs')
+    arg_parser.add_argument('program', nargs='?', help='bytecode path (text or binary)')
+    arg_parser.add_argument('inputs', nargs='*', help='input files, one job each (default: one job without input)')
+    arg_parser.add_argument('--jobs-file', help='file with one "bytecode [input]" job per line')
+    arg_parser.add_argument('-j', '--workers', type=int, help='worker processes (default: one per core)')
+    arg_parser.add_argument('--output-dir', help='write the output of job N to N.out in this directory')
+    arg_parser.add_argument('--quiet', action='store_true', help='only print failures and the summary')
+    args = arg_parser.parse_args()
+
+    if args.jobs_file is not None:
+        if args.program is not None:
+            arg_parser.error('pass either a program or --jobs-file')
+        jobs = read_jobs(args.jobs_file)
+    elif args.program is not None:
+        jobs = [(args.program, input_path) for input_path in args.inputs] or [(args.program, None)]
+    else:
+        arg_parser.error('a program or --jobs-file is required')
+
+    start = time.perf_counter()
+    results = run_jobs(jobs, args.workers)
+    elapsed = time.perf_counter() - start
+
+    if args.output_dir is not None:
+        Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+
+    for index, result in enumerate(results):
+        if args.output_dir is not None:
+            with open(Path(args.output_dir) / '{}.out'.format(index), 'w') as file:
+                file.write(result['output'])
+        elif not args.quiet:
+            print('== job {}: {} {} (exit {}, {:.2f}ms)'.format(
+                index, result['program'], result['input'] or '-', result['status'], 1000 * result['latency']
+            ))
+            print(result['output'], end='')
+
+        if result['status'] != 0:
+            print('ERROR: job {} ({} {}): {}'.format(index, result['program'], result['input'] or '-',
+                                                   result['error']))
+
+    report = summary(results, elapsed)
+    print(format_summary(report))
+    if report['failed']:
+        exit(1)
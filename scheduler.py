@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import collections
+import io
+
+import bytecode
+from bytecode import BytecodeError
+from streams import Channel
+from virtual_machine import BLOCKED, FINISHED, PAUSED, VirtualMachine
+
+READY = 'ready'
+FAILED = 'failed'
+KILLED = 'killed'
+
+
+class Task:
+    def __init__(self, name: str, vm: VirtualMachine, stdin, priority: int = 1, limit: int | None = None):
+        self.name = name
+        self.vm = vm
+        self.stdin = stdin
+        self.priority = priority
+        self.limit = limit
+        self.status = READY
+        self.error = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (FINISHED, FAILED, KILLED)
+
+    def __repr__(self) -> str:
+        return 'Task({!r}, {})'.format(self.name, self.status)
+
+
+class Scheduler:
+    DEFAULT_QUANTUM = 1000
+
+    def __init__(self, quantum: int = DEFAULT_QUANTUM):
+        self.quantum = quantum
+        self.tasks = []
+        self.ready = collections.deque()
+        self.wakeup = None
+
+    def spawn(self, byte_code: str | list, stdin=None, stdout=None, name: str | None = None, priority: int = 1,
+              limit: int | None = None) -> Task:
+        if stdin is None or isinstance(stdin, str):
+            stdin = io.StringIO(stdin or '')
+
+        task = Task(name or 'task{}'.format(len(self.tasks)), VirtualMachine(byte_code, stdin, stdout), stdin,
+                    priority, limit)
+        if isinstance(stdin, Channel):
+            stdin.waiter = lambda: self.wake(task)
+
+        self.tasks.append(task)
+        self.ready.append(task)
+        return task
+
+    def wake(self, task: Task):
+        if task.status == BLOCKED:
+            task.status = READY
+            self.ready.append(task)
+            if self.wakeup is not None:
+                self.wakeup.set()
+
+    def step(self) -> bool:
+        if not self.ready:
+            return False
+
+        task = self.ready.popleft()
+        budget = self.quantum * task.priority
+        if task.limit is not None:
+            budget = min(budget, task.limit - task.vm.executed)
+
+        try:
+            status = task.vm.run(budget)
+        except Exception as e:
+            task.status = FAILED
+            task.error = '{}: {}'.format(type(e).__name__, e)
+            task.vm.output.flush()
+            return True
+
+        if status == PAUSED and task.limit is not None and task.vm.executed >= task.limit:
+            task.status = KILLED
+            task.error = 'Instruction limit of {} exceeded'.format(task.limit)
+            task.vm.output.flush()
+        elif status == PAUSED:
+            self.ready.append(task)
+        else:
+            task.status = status
+
+        return True
+
+    def run(self) -> list:
+        while self.step():
+            pass
+        return self.tasks
+
+    async def run_async(self) -> list:
+        self.wakeup = asyncio.Event()
+        try:
+            while not all(task.done for task in self.tasks):
+                if self.step():
+                    await asyncio.sleep(0)
+                else:
+                    self.wakeup.clear()
+                    await self.wakeup.wait()
+        finally:
+            self.wakeup = None
+        return self.tasks
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Run many PJP programs interleaved in one process')
+    arg_parser.add_argument('programs', nargs='+', help='bytecode paths (text or binary)')
+    arg_parser.add_argument('--quantum', type=int, default=Scheduler.DEFAULT_QUANTUM,
+                            help='instructions each program runs before the next one gets a turn')
+    arg_parser.add_argument('--limit', type=int, help='stop any program after this many instructions')
+    args = arg_parser.parse_args()
+
+    scheduler = Scheduler(args.quantum)
+    outputs = []
+    for path in args.programs:
+        try:
+            instructions = bytecode.load(path)
+        except (BytecodeError, OSError) as e:
+            print('ERROR: {}: {}'.format(path, e))
+            exit(1)
+        outputs.append(io.StringIO())
+        scheduler.spawn(instructions, stdout=outputs[-1], name=path, limit=args.limit)
+
+    for task, output in zip(scheduler.run(), outputs):
+        print('== {} ({}, {} instructions)'.format(task.name, task.status, task.vm.executed))
+        print(output.getvalue(), end='')
+        if task.error is not None:
+            print('ERROR: {}'.format(task.error))
+
+    if any(task.status != FINISHED for task in scheduler.tasks):
+        exit(1)
@@ -0,0 +1,194 @@
+import argparse
+import base64
+import collections
+import contextlib
+import errno
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import tempfile
+import time
+import traceback
+from pathlib import Path
+
+import optimizer
+from compile_cache import CompileCache
+from main import cache_key, compile_source, warm_up
+
+
+def runtime_directory() -> Path:
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return Path(os.environ['XDG_RUNTIME_DIR'])
+    return Path(tempfile.gettempdir()) / 'pjp-{}'.format(os.getuid())
+
+
+DEFAULT_SOCKET = runtime_directory() / 'pjp-compile.sock'
+
+
+def check_directory(path: Path, create=False):
+    if create:
+        path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError('{} must be a directory owned by the current user with mode 0700'.format(path))
+
+
+class CompileHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.dispatch(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                response = {'ok': False, 'exit': 1, 'messages': 'ERROR: Bad request: {}'.format(e)}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+class CompileServer(socketserver.UnixStreamServer):
+    LATENCY_WINDOW = 10000
+
+    def __init__(self, path=DEFAULT_SOCKET, cache: CompileCache | None = None):
+        self.path = Path(path)
+        check_directory(self.path.parent, create=True)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(str(self.path))
+            except FileNotFoundError:
+                pass
+            except ConnectionRefusedError:
+                self.path.unlink()
+            else:
+                raise OSError(errno.EADDRINUSE, 'A compile server is already listening on {}'.format(self.path))
+        super().__init__(str(self.path), CompileHandler)
+
+        self.cache = cache
+        self.started = time.time()
+        self.requests = 0
+        self.failures = 0
+        self.latencies = collections.deque(maxlen=self.LATENCY_WINDOW)
+        warm_up()
+
+    def server_close(self):
+        super().server_close()
+        with contextlib.suppress(FileNotFoundError):
+            self.path.unlink()
+
+    def dispatch(self, request: dict) -> dict:
+        if request['command'] == 'compile':
+            start = time.perf_counter()
+            response = self.compile(request['source'], **request.get('options', {}))
+            self.latencies.append(time.perf_counter() - start)
+            self.requests += 1
+            self.failures += not response['ok']
+            return response
+        elif request['command'] == 'stats':
+            return {'ok': True, 'stats': self.stats()}
+        raise ValueError('unknown command {}'.format(request['command']))
+
+    def compile(self, source: str, binary=False, slots=False, typed=False, link=False, lines=False, optimize=False,
+                rules=None, stats=False, cache=True) -> dict:
+        passes = optimizer.create_passes(rules) if optimize else []
+        cache = self.cache if cache and not stats else None
+
+        key = data = None
+        if cache is not None:
+            key = cache_key(cache, source, binary, passes, slots, typed, link, lines)
+            data = cache.get(key)
+        cached = data is not None
+
+        messages = io.StringIO()
+        exit_code = 0
+        if data is None:
+            try:
+                with contextlib.redirect_stdout(messages), contextlib.redirect_stderr(messages):
+                    data = compile_source(source, binary, passes, slots, typed, link, lines)
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else 1
+            except Exception:
+                exit_code = 1
+                messages.write('ERROR: Compiler failed\n{}'.format(traceback.format_exc()))
+            if data is not None and cache is not None:
+                cache.put(key, data)
+
+        if stats:
+            for optimization_pass in passes:
+                print(optimization_pass.report(), file=messages)
+
+        return {
+            'ok': data is not None,
+            'exit': exit_code,
+            'bytecode': None if data is None else base64.b64encode(data).decode('ascii'),
+            'messages': messages.getvalue(),
+            'cached': cached,
+        }
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        percentile = lambda share: latencies[min(len(latencies) - 1, int(len(latencies) * share))] if latencies else 0.0
+        return {
+            'uptime': time.time() - self.started,
+            'requests': self.requests,
+            'failures': self.failures,
+            'cache_hits': 0 if self.cache is None else self.cache.hits,
+            'cache_misses': 0 if self.cache is None else self.cache.misses,
+            'latency_mean': sum(latencies) / len(latencies) if latencies else 0.0,
+            'latency_p50': percentile(0.5),
+            'latency_p95': percentile(0.95),
+            'latency_max': latencies[-1] if latencies else 0.0,
+        }
+
+
+def request(message: dict, path=DEFAULT_SOCKET) -> dict:
+    check_directory(Path(path).parent)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(str(path))
+        client.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        with client.makefile('rb') as file:
+            line = file.readline()
+    if not line.endswith(b'\n'):
+        raise ValueError('incomplete response from the compile server')
+    return json.loads(line)
+
+
+def format_stats(stats: dict) -> str:
+    return ('{requests} requests ({failures} failed), cache: {cache_hits} hits, {cache_misses} misses\n'
+            'latency: mean {mean:.2f}ms, p50 {p50:.2f}ms, p95 {p95:.2f}ms, max {max:.2f}ms').format(
+        mean=1000 * stats['latency_mean'], p50=1000 * stats['latency_p50'], p95=1000 * stats['latency_p95'],
+        max=1000 * stats['latency_max'], **stats
+    )
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Compile server that keeps the parser warm between requests')
+    arg_parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Unix socket path (default: %(default)s)')
+    arg_parser.add_argument('--no-cache', action='store_true', help='always recompile, bypassing the bytecode cache')
+    arg_parser.add_argument('--cache-dir', help='bytecode cache directory')
+    arg_parser.add_argument('--cache-size', type=int, default=CompileCache.DEFAULT_MAX_SIZE,
+                            help='bytecode cache size limit in bytes')
+    arg_parser.add_argument('--stats', action='store_true', help='print the metrics of the running server and exit')
+    args = arg_parser.parse_args()
+
+    if args.stats:
+        try:
+            print(format_stats(request({'command': 'stats'}, args.socket)['stats']))
+        except OSError as e:
+            print('ERROR: Cannot reach the compile server at {}: {}'.format(args.socket, e))
+            exit(1)
+        exit(0)
+
+    try:
+        server = CompileServer(args.socket, None if args.no_cache else CompileCache(args.cache_dir, args.cache_size))
+    except OSError as e:
+        print('ERROR: Cannot listen on {}: {}'.format(args.socket, e))
+        exit(1)
+    signal.signal(signal.SIGTERM, lambda signum, frame: exit(0))
+    print('Listening on {}'.format(args.socket), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
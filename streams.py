@@ -0,0 +1,106 @@
+import sys
+
+
+class OutputBuffer:
+    DEFAULT_SIZE = 1 << 16
+
+    def __init__(self, stream=None, size: int = DEFAULT_SIZE):
+        self.stream = stream
+        self.size = size
+        self.parts = []
+        self.length = 0
+        self.pending = False
+
+    def write(self, text: str):
+        self.pending = True
+        self.parts.append(text)
+        self.length += len(text)
+        if self.length >= self.size:
+            self.drain()
+
+    def drain(self):
+        if self.parts:
+            stream = sys.stdout if self.stream is None else self.stream
+            stream.write(''.join(self.parts))
+            self.parts = []
+            self.length = 0
+
+    def flush(self):
+        self.drain()
+        stream = sys.stdout if self.stream is None else self.stream
+        stream.flush()
+        self.pending = False
+
+
+class InputReader:
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, stream=None, output: OutputBuffer | None = None, chunk_size: int = CHUNK_SIZE):
+        self.stream = stream
+        self.output = output
+        self.chunk_size = chunk_size
+        self.lines = []
+        self.position = 0
+        self.partial = ''
+        self.eof = False
+
+    def fill(self) -> bool:
+        stream = sys.stdin if self.stream is None else self.stream
+        interactive = stream.isatty() if hasattr(stream, 'isatty') else False
+
+        while not self.eof:
+            chunk = stream.readline() if interactive else stream.read(self.chunk_size)
+            if chunk == '':
+                self.eof = True
+                if self.partial != '':
+                    self.lines, self.position, self.partial = [self.partial], 0, ''
+                    return True
+                return False
+
+            lines = (self.partial + chunk).split('\n')
+            self.partial = lines.pop()
+            if lines:
+                self.lines, self.position = lines, 0
+                return True
+
+        return False
+
+    def readline(self) -> str:
+        if self.output is not None and self.output.pending:
+            self.output.flush()
+
+        if self.position == len(self.lines) and not self.fill():
+            raise EOFError('EOF when reading a line')
+
+        line = self.lines[self.position]
+        self.position += 1
+        return line
+
+
+class Channel:
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+        self.waiter = None
+
+    def send(self, text: str):
+        self.parts.append(text)
+        if self.waiter is not None:
+            self.waiter()
+
+    def close(self):
+        self.closed = True
+        if self.waiter is not None:
+            self.waiter()
+
+    def ready(self) -> bool:
+        return bool(self.parts) or self.closed
+
+    def read(self, size: int = -1) -> str:
+        if self.parts:
+            text = ''.join(self.parts)
+            self.parts = []
+            return text
+        elif self.closed:
+            return ''
+        raise BlockingIOError('No input available')
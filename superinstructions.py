@@ -0,0 +1,87 @@
+import argparse
+import collections
+import io
+
+import assembler
+import bytecode
+from optimizer import SuperinstructionFuser
+from virtual_machine import VirtualMachine
+
+
+class CountingVirtualMachine(VirtualMachine):
+    def interpret(self):
+        program = self.program
+        program_length = len(program)
+        self.counts = counts = [0] * program_length
+
+        while self.current_line < program_length:
+            counts[self.current_line] += 1
+            method, instruction_args = program[self.current_line]
+            self.current_line = self.current_line + 1
+            method(instruction_args)
+
+
+def count_ngrams(opcodes: list, weights: list, sizes: list, counter: collections.Counter):
+    for n in sizes:
+        for i in range(len(opcodes) - n + 1):
+            window = opcodes[i:i + n]
+            if 'label' in window or 'jmp' in window[:-1] or 'fjmp' in window[:-1]:
+                continue
+
+            weight = min(weights[i:i + n])
+            if weight > 0:
+                counter[tuple(window)] += weight
+
+
+def analyze(paths: list, sizes: list, execute: bool = False, input_text: str = '') -> collections.Counter:
+    counter = collections.Counter()
+    for path in paths:
+        instructions = assembler.link(bytecode.load(path))
+        opcodes = [opcode for opcode, args in assembler.unlink(instructions) if opcode not in bytecode.DIRECTIVES]
+
+        if execute:
+            vm = CountingVirtualMachine(instructions, stdin=io.StringIO(input_text), stdout=io.StringIO())
+            vm.execute()
+            counts = vm.counts + [0]
+            weights = []
+            position = 0
+            for opcode in opcodes:
+                weights.append(counts[position])
+                if opcode != 'label':
+                    position += 1
+        else:
+            weights = [1] * len(opcodes)
+
+        count_ngrams(opcodes, weights, sizes, counter)
+
+    return counter
+
+
+def report(counter: collections.Counter, top: int) -> str:
+    scores = sorted(counter.items(), key=lambda item: item[1] * (len(item[0]) - 1), reverse=True)
+
+    lines = ['{:<40} {:>12} {:>12}  {}'.format('n-gram', 'count', 'saved', 'superinstruction')]
+    for ngram, count in scores[:top]:
+        superinstruction = SuperinstructionFuser.PATTERNS.get(ngram, '-')
+        lines.append('{:<40} {:>12} {:>12}  {}'.format(
+            ' '.join(ngram), count, count * (len(ngram) - 1), superinstruction
+        ))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Report opcode n-grams worth fusing into superinstructions')
+    arg_parser.add_argument('bytecode', nargs='+', help='bytecode files (text or binary)')
+    arg_parser.add_argument('-n', type=int, nargs='+', default=[2, 3, 4], help='n-gram sizes')
+    arg_parser.add_argument('--top', type=int, default=20, help='number of n-grams to report')
+    arg_parser.add_argument('--execute', action='store_true', help='weight n-grams by executed instruction counts')
+    arg_parser.add_argument('--input', help='stdin contents for executed programs')
+    args = arg_parser.parse_args()
+
+    input_text = ''
+    if args.input:
+        with open(args.input, 'r') as file:
+            input_text = file.read()
+
+    print(report(analyze(args.bytecode, args.n, args.execute, input_text), args.top))
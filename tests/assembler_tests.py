@@ -0,0 +1,71 @@
+import io
+import unittest
+
+import assembler
+import bytecode
+from bytecode import BytecodeError
+from virtual_machine import VirtualMachine
+
+LOOP = '''push I 0
+save i
+label 0
+load i
+push I 3
+lt
+fjmp 1
+load i
+print 1
+load i
+push I 1
+add
+save i
+jmp 0
+label 1'''
+
+
+class AssemblerTestCase(unittest.TestCase):
+    def test_labels_become_offsets(self):
+        linked = assembler.link(bytecode.parse_text(LOOP))
+
+        self.assertEqual(('linked', None), linked[0])
+        self.assertNotIn('label', [opcode for opcode, args in linked])
+        self.assertEqual(('fjmp', 13), linked[6])
+        self.assertEqual(('jmp', 2), linked[13])
+
+    def test_link_is_idempotent(self):
+        linked = assembler.link(bytecode.parse_text(LOOP))
+
+        self.assertIs(linked, assembler.link(linked))
+
+    def test_undefined_label(self):
+        with self.assertRaisesRegex(BytecodeError, 'Undefined label 7'):
+            assembler.link(bytecode.parse_text('jmp 7'))
+
+    def test_duplicate_label(self):
+        with self.assertRaisesRegex(BytecodeError, 'Duplicate label 0'):
+            assembler.link(bytecode.parse_text('label 0\nlabel 0'))
+
+    def test_target_out_of_range(self):
+        with self.assertRaisesRegex(BytecodeError, 'Jump target 5 out of range'):
+            assembler.link(bytecode.parse_text('linked\njmp 5'))
+
+    def test_unlink(self):
+        instructions = assembler.unlink(assembler.link(bytecode.parse_text(LOOP)))
+
+        self.assertEqual(assembler.link(instructions), assembler.link(bytecode.parse_text(LOOP)))
+        self.assertEqual(2, [opcode for opcode, args in instructions].count('label'))
+
+    def test_binary_roundtrip(self):
+        linked = assembler.link(bytecode.parse_text('var 0 i\n' + LOOP.replace(' i', ' 0')))
+
+        self.assertEqual(linked, bytecode.decode(bytecode.encode(linked)))
+
+    def test_virtual_machine_runs_linked_code(self):
+        stdout = io.StringIO()
+        VirtualMachine(assembler.link(bytecode.parse_text(LOOP)), stdout=stdout).execute()
+
+        self.assertEqual('0\n1\n2\n', stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
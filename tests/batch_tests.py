@@ -0,0 +1,64 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import batch
+import optimizer
+from main import compile_source
+
+
+class BatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.sources = Path(self.directory.name) / 'sources'
+        self.output = Path(self.directory.name) / 'build'
+        (self.sources / 'nested').mkdir(parents=True)
+
+        examples = Path(__file__).parent.parent / 'examples'
+        for name in ['example01.txt', 'example03.txt']:
+            (self.sources / name).write_text((examples / name).read_text())
+        (self.sources / 'nested' / 'types.txt').write_text('int a;\na = "x";')
+        (self.sources / 'nested' / 'syntax.txt').write_text('int a a;')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_collect_sources(self):
+        sources = batch.collect_sources([self.sources, self.sources / 'example01.txt'])
+
+        self.assertEqual(
+            ['example01.txt', 'example03.txt', 'nested/syntax.txt', 'nested/types.txt'],
+            [relative.as_posix() for source, relative in sources]
+        )
+
+    def test_colliding_outputs(self):
+        (self.sources / 'types.txt').write_text('int b;')
+
+        sources = batch.collect_sources([self.sources / 'nested' / 'types.txt', self.sources / 'nested'])
+        self.assertEqual(['types.txt', 'syntax.txt'], [relative.as_posix() for source, relative in sources])
+
+        with self.assertRaises(ValueError):
+            batch.collect_sources([self.sources / 'nested' / 'types.txt', self.sources / 'types.txt'])
+
+    def compile(self, jobs: int) -> dict:
+        results = batch.compile_batch(batch.collect_sources([self.sources]), self.output, jobs, optimize=True,
+                                      cache=False)
+        return {Path(source).name: error for source, error, seconds in results}
+
+    def test_compiles_each_file_and_collects_errors(self):
+        for jobs in [1, 2]:
+            errors = self.compile(jobs)
+
+            self.assertIsNone(errors['example01.txt'])
+            self.assertIsNone(errors['example03.txt'])
+            self.assertIn('Type errors:', errors['types.txt'])
+            self.assertIn("extraneous input 'a'", errors['syntax.txt'])
+
+            source = (self.sources / 'example03.txt').read_text()
+            expected = compile_source(source, passes=optimizer.create_passes())
+            self.assertEqual(expected, (self.output / 'example03.bc').read_bytes())
+            self.assertFalse((self.output / 'nested' / 'types.bc').exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
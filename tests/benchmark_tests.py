@@ -0,0 +1,32 @@
+import unittest
+
+import benchmark
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    def test_run_times_every_phase(self):
+        results = benchmark.run(scale=0.01, repeat=1, typed=True, optimize=True)
+
+        self.assertEqual(set(benchmark.WORKLOADS), set(results['results']))
+        for result in results['results'].values():
+            self.assertEqual(benchmark.PHASES, list(result['phases']))
+            for timing in result['phases'].values():
+                self.assertEqual([timing['min']], timing['times'])
+
+    def test_compare_flags_regressions(self):
+        def results(execute, parse):
+            return {'results': {'while_counter': {'phases': {
+                'execute': {'min': execute}, 'parse': {'min': parse},
+            }}}}
+
+        rows = benchmark.compare(results(1.0, 0.0001), results(1.5, 0.0002), threshold=0.1, min_time=0.001)
+
+        self.assertEqual({'execute': 'REGRESSION', 'parse': ''}, {row['phase']: row['status'] for row in rows})
+        self.assertAlmostEqual(0.5, rows[0]['change'])
+
+        rows = benchmark.compare(results(1.0, 0.0001), results(0.5, 0.0001))
+        self.assertEqual('improvement', rows[0]['status'])
+
+
+if __name__ == '__main__':
+    unittest.main()
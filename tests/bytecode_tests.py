@@ -0,0 +1,59 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import bytecode
+from main import main
+
+
+class BytecodeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = Path(__file__).parent.parent
+
+    def binary_test(self, source_code_path: str, ground_truth_path: str, slots: bool = False):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = Path(tmp_dir) / 'bytecode.bin'
+            main(self.base_dir / source_code_path, output, binary=True, slots=slots)
+
+            self.assertTrue(bytecode.is_binary(output))
+            instructions = bytecode.resolve_symbols(bytecode.load(output))
+
+        with open(self.base_dir / ground_truth_path, 'r') as file:
+            expected = bytecode.parse_text(file.read())
+
+        self.assertEqual(expected, instructions)
+
+    def test_example01(self):
+        self.binary_test('examples/example01.txt', 'examples/example01_result.txt')
+
+    def test_example03(self):
+        self.binary_test('examples/example03.txt', 'examples/example03_result.txt')
+
+    def test_example03_slots(self):
+        self.binary_test('examples/example03.txt', 'examples/example03_result.txt', slots=True)
+
+    def test_superinstruction_roundtrip(self):
+        instructions = bytecode.parse_text('var 0 i\nload_push_lti_fjmp 0 3 S "a b"\nload_load_add 0 0\nprint 1')
+
+        self.assertEqual(('load_push_lti_fjmp', (0, 3, 'a b')), instructions[1])
+        self.assertEqual(instructions, bytecode.decode(bytecode.encode(instructions)))
+
+    def test_constant_pool_keeps_negative_zero(self):
+        instructions = bytecode.decode(bytecode.encode(bytecode.parse_text('push F 0.0\npush F -0.0\nprint 2')))
+
+        self.assertEqual('push F 0.0\npush F -0.0\nprint 2', bytecode.format_text(instructions))
+
+    def test_errors(self):
+        for text in ['push I {}'.format(1 << 63), 'push I x', 'print', 'load_load_add 0', 'var x y']:
+            with self.subTest(text=text), self.assertRaises(bytecode.BytecodeError):
+                bytecode.encode(bytecode.parse_text(text))
+
+    def test_text_roundtrip(self):
+        with open(self.base_dir / 'examples/example02_result.txt', 'r') as file:
+            text = file.read().strip()
+
+        self.assertEqual(text, bytecode.format_text(bytecode.parse_text(text)))
+
+
+if __name__ == '__main__':
+    unittest.main()
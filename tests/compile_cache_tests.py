@@ -0,0 +1,83 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from compile_cache import CompileCache, compiler_files, compiler_version
+from main import main
+
+
+class CompileCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.base_dir = Path(__file__).parent.parent
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_key_depends_on_source_and_options(self):
+        cache = CompileCache(self.directory.name)
+
+        self.assertEqual(cache.key('int a;', binary=False), cache.key('int a;', binary=False))
+        self.assertNotEqual(cache.key('int a;', binary=False), cache.key('int b;', binary=False))
+        self.assertNotEqual(cache.key('int a;', binary=False), cache.key('int a;', binary=True))
+
+    def test_version_covers_constant_folding(self):
+        import optimizer
+
+        modules = [module for module in sys.modules.values()
+                   if Path(getattr(module, '__file__', None) or '/').parent == self.base_dir]
+        self.assertIn(optimizer, modules)
+        for module in modules:
+            self.assertIn(Path(module.__file__).relative_to(self.base_dir), compiler_files())
+
+        copy = Path(self.directory.name) / 'compiler'
+        (copy / 'grammar').mkdir(parents=True)
+        for name in compiler_files():
+            shutil.copy(self.base_dir / name, copy / name)
+
+        version = compiler_version(copy)
+        self.assertEqual(compiler_version(), version)
+        with open(copy / 'rope.py', 'a') as file:
+            file.write('\n')
+        self.assertNotEqual(version, compiler_version(copy))
+
+    def test_hits_and_misses(self):
+        cache = CompileCache(self.directory.name)
+        key = cache.key('int a;')
+
+        self.assertIsNone(cache.get(key))
+        cache.put(key, b'push I 0')
+        self.assertEqual(b'push I 0', cache.get(key))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_evicts_least_recently_used(self):
+        cache = CompileCache(self.directory.name, max_size=8)
+        cache.put('old', b'1234')
+        os.utime(cache.path('old'), (0, 0))
+        cache.put('new', b'5678')
+        cache.put('newest', b'9')
+
+        self.assertFalse(cache.path('old').exists())
+        self.assertTrue(cache.path('new').exists())
+        self.assertEqual(1, cache.evictions)
+
+    def test_main_uses_cache(self):
+        cache = CompileCache(self.directory.name)
+        output = Path(self.directory.name) / 'out.txt'
+
+        main(self.base_dir / 'examples/example03.txt', output, cache=cache)
+        with open(output, 'r') as file:
+            compiled = file.read()
+        output.unlink()
+
+        main(self.base_dir / 'examples/example03.txt', output, cache=cache)
+        with open(output, 'r') as file:
+            self.assertEqual(compiled, file.read())
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import contextlib
+import io
+import unittest
+from pathlib import Path
+
+import bytecode
+import optimizer
+from incremental import IncrementalCompiler, split, statements
+from main import compile_source
+from repl import Session
+
+EXAMPLES = Path(__file__).parent.parent / 'examples'
+
+
+def format_text(instructions: list) -> bytes:
+    return "\n".join(bytecode.format_instruction(opcode, args) for opcode, args in instructions).encode('utf-8')
+
+
+class IncrementalTestCase(unittest.TestCase):
+    def test_split_statements(self):
+        text = ('int a; // ; {\nif (a > 1) write "};"; else { write 2; }\n'
+                'while (a < 3) { a = a + 1; }\nif (true) { a = 1; }\nelse write 3;\nwrite a;')
+        self.assertEqual([
+            ('int a;', 1, 0),
+            ('if (a > 1) write "};"; else { write 2; }', 2, 0),
+            ('while (a < 3) { a = a + 1; }', 3, 0),
+            ('if (true) { a = 1; }\nelse write 3;', 4, 0),
+            ('write a;', 6, 0),
+        ], list(statements(text)))
+        self.assertFalse(split('while (a < 3) {\n a = 1;')[1])
+        self.assertTrue(split('int a;   \n')[1])
+
+    def test_matches_compile_source(self):
+        for example in ['example01.txt', 'example03.txt']:
+            text = (EXAMPLES / example).read_text()
+            for options in [{}, {'slots': True, 'link': True}, {'typed': True, 'lines': True}]:
+                for passes in [None, optimizer.create_passes()]:
+                    compiler = IncrementalCompiler(passes, **options)
+                    self.assertEqual(compile_source(text, passes=passes, **options), format_text(compiler.compile(text)))
+
+    def test_recompiles_changed_statements(self):
+        text = 'int a;\nfloat b;\na = 1;\nwhile (a < 3) { a = a + 1; }\nb = a * 2;\nif (b > 2) write b; else write a;\n'
+        compiler = IncrementalCompiler(slots=True)
+        compiler.compile(text)
+        self.assertEqual((6, 0), (compiler.compiled, compiler.reused))
+
+        for edit, counts in [
+            (lambda source: source.replace('a = 1;', 'a = 2;'), (1, 5)),
+            (lambda source: 'int c;\n' + source, (1, 6)),
+            (lambda source: source.replace('float b;', 'int b;'), (3, 4)),
+        ]:
+            text = edit(text)
+            instructions = compiler.compile(text)
+            self.assertEqual(compile_source(text, slots=True), format_text(instructions))
+            self.assertEqual(counts, (compiler.compiled, compiler.reused))
+
+    def test_errors_match_compile_source(self):
+        def run(function, text: str) -> tuple:
+            output = io.StringIO()
+            result = 'exit'
+            with contextlib.redirect_stdout(output), contextlib.suppress(SystemExit):
+                result = function(text)
+            return result, output.getvalue()
+
+        def compile_incremental(text: str):
+            instructions = IncrementalCompiler().compile(text)
+            return None if instructions is None else format_text(instructions)
+
+        for text in ['int a;\nwrite b;\na = 1.5;\n', 'int a;\nwrite a +;\n', 'int a; read a;\nelse write 1;\nwrite 2;']:
+            self.assertEqual(run(compile_source, text), run(compile_incremental, text))
+
+
+class SessionTestCase(unittest.TestCase):
+    def interact(self, text: str) -> str:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            session = Session(io.StringIO(text))
+            session.interact()
+        return output.getvalue()
+
+    def test_keeps_variables(self):
+        self.assertEqual('3\n5\n', self.interact('int a;\na = 3;\nwrite a;\nwhile (a < 5) {\n a = a + 1;\n}\nwrite a;\n'))
+
+    def test_reads_from_session_input(self):
+        self.assertEqual('hello!\n', self.interact('string s;\nread s;\nhello\nwrite s . "!";\n'))
+
+    def test_survives_errors(self):
+        output = self.interact('int a;\nint a;\nwrite b;\nwrite 1 / 0;\na = 2;\n:vars\n')
+        self.assertIn('Multiple declaration of a', output)
+        self.assertIn('b was not declared', output)
+        self.assertIn('ZeroDivisionError', output)
+        self.assertTrue(output.endswith('int a = 2\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
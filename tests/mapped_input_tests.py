@@ -0,0 +1,96 @@
+import contextlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from antlr4 import InputStream
+
+import optimizer
+from main import check, compile_file, compile_source, parse_statements, statement_parser
+from mapped_input import MappedInputStream
+
+
+class MappedInputStreamTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def source(self, text: str, name: str = 'source.txt') -> Path:
+        path = self.path / name
+        path.write_text(text, encoding='utf-8')
+        return path
+
+    def test_matches_input_stream(self):
+        text = 'write "héllo €\U0001d11e", 1;\nint a;\n'
+        expected = InputStream(text)
+        with MappedInputStream(self.source(text)) as stream:
+            while expected.LA(1) != -1:
+                self.assertEqual((expected.LA(-1), expected.LA(1), expected.LA(2)),
+                                 (stream.LA(-1), stream.LA(1), stream.LA(2)))
+                expected.consume()
+                stream.consume()
+
+            self.assertEqual(-1, stream.LA(1))
+            self.assertEqual(text, str(stream))
+
+    def test_empty_file(self):
+        with MappedInputStream(self.source('')) as stream:
+            self.assertEqual((0, -1), (stream.size, stream.LA(1)))
+
+    def test_statements_release_tokens(self):
+        names = [''.join(chr(ord('a') + int(digit)) for digit in str(i)) for i in range(50)]
+        text = ''.join('int x{0};\nx{0} = 1 + 2;\n'.format(name) for name in names)
+        with MappedInputStream(self.source(text)) as stream:
+            parser = statement_parser(stream)
+            token_counts = [len(parser.getTokenStream().tokens) for statement in parse_statements(parser)]
+
+        self.assertEqual(100, len(token_counts))
+        self.assertLess(max(token_counts), 10)
+
+    def test_compile_file_matches_compile_source(self):
+        text = (Path(__file__).parent.parent / 'examples' / 'example03.txt').read_text()
+        source = self.source(text)
+
+        for options in [{}, {'link': True, 'lines': True}, {'binary': True, 'typed': True}]:
+            for passes in [None, optimizer.create_passes()]:
+                output = self.path / 'out'
+                self.assertTrue(compile_file(source, output, passes=passes, **options))
+                self.assertEqual(compile_source(text, passes=passes, **options), output.read_bytes())
+
+    def test_errors_leave_no_output(self):
+        output = self.path / 'out'
+
+        messages = io.StringIO()
+        with contextlib.redirect_stdout(messages):
+            self.assertFalse(compile_file(self.source('int a;\nint a a;\nwrite a;'), output))
+        self.assertIn("extraneous input 'a'", messages.getvalue())
+
+        with contextlib.redirect_stdout(messages), self.assertRaises(SystemExit):
+            compile_file(self.source('int a;\na = "x";\nwrite b;'), output)
+        self.assertIn('b was not declared', messages.getvalue())
+
+        self.assertEqual([], [path.name for path in self.path.iterdir() if path.name.startswith('out')])
+
+    def test_syntax_errors_match_compile_source(self):
+        output = self.path / 'out'
+
+        for text in ['int a; a = 1; if (a > 0 { write 1; }', 'int a;\nint a a;\nwrite a;',
+                     'int a;\na = 1;\nstring s\ns = "x";\nwhile (a < 3) { a = a + 1 }',
+                     'int a; a = (((1 + 2) * 3);\nwrite "x" . ;\n']:
+            expected = io.StringIO()
+            with contextlib.redirect_stdout(expected):
+                self.assertIsNone(check(text))
+
+            messages = io.StringIO()
+            with contextlib.redirect_stdout(messages):
+                self.assertFalse(compile_file(self.source(text), output))
+            self.assertEqual(expected.getvalue(), messages.getvalue())
+            self.assertFalse(output.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+
+import bytecode
+import optimizer
+from optimizer import ConstantFolder, PeepholeOptimizer, SuperinstructionFuser
+
+
+class OptimizationPassTestCase(unittest.TestCase):
+    optimization_pass = None
+
+    def optimize(self, byte_code: str, rules: list | None = None):
+        optimization_pass = self.optimization_pass(rules)
+        instructions = optimization_pass.optimize(bytecode.parse_text(byte_code))
+        return bytecode.format_text(instructions).split('\n'), optimization_pass.stats
+
+
+class PeepholeOptimizerTestCase(OptimizationPassTestCase):
+    optimization_pass = PeepholeOptimizer
+
+    def test_save_load_pop(self):
+        instructions, stats = self.optimize('push I 1\nsave x\nload x\npop')
+
+        self.assertEqual(['push I 1', 'save x'], instructions)
+        self.assertEqual(2, stats['save_load_pop'])
+
+    def test_eq_not(self):
+        instructions, stats = self.optimize('load a\nload b\neq\nnot\nprint 1')
+
+        self.assertEqual(['load a', 'load b', 'neq', 'print 1'], instructions)
+        self.assertEqual(1, stats['eq_not'])
+
+    def test_if_body_labels(self):
+        instructions, stats = self.optimize('load a\nfjmp 0\npush I 1\nprint 1\njmp 1\nlabel 0\nlabel 1')
+
+        self.assertEqual(['load a', 'fjmp 0', 'push I 1', 'print 1', 'label 0'], instructions)
+        self.assertEqual(1, stats['jump_to_next'])
+        self.assertEqual(1, stats['dead_labels'])
+
+    def test_thread_jumps(self):
+        instructions, stats = self.optimize(
+            'load a\nfjmp 0\njmp 1\nlabel 0\nlabel 2\njmp 3\nlabel 1\npush I 1\nprint 1\nlabel 3',
+            ['thread_jumps', 'dead_labels']
+        )
+
+        self.assertEqual(['load a', 'fjmp 3', 'jmp 1', 'jmp 3', 'label 1', 'push I 1', 'print 1', 'label 3'],
+                         instructions)
+        self.assertEqual(2, stats['dead_labels'])
+
+    def test_unknown_rule(self):
+        with self.assertRaises(ValueError):
+            optimizer.create_passes(['missing'])
+
+
+class ConstantFolderTestCase(OptimizationPassTestCase):
+    optimization_pass = ConstantFolder
+
+    def test_fold_expression(self):
+        instructions, stats = self.optimize('push I 2\npush I 3\npush I 5\nmul\nadd\npush I 1\nitof\nprint 2')
+
+        self.assertEqual(['push I 17', 'push F 1.0', 'print 2'], instructions)
+        self.assertEqual(5, stats['fold_constants'])
+
+    def test_fold_long_concat(self):
+        instructions, stats = self.optimize('push S "{0}"\npush S "{0}"\nconcat\nprint 1'.format('a' * 200))
+
+        self.assertEqual(['push S "{}"'.format('a' * 400), 'print 1'], instructions)
+        self.assertEqual(2, stats['fold_constants'])
+
+    def test_division_by_zero_is_kept(self):
+        instructions, stats = self.optimize('push I 1\npush I 0\ndiv\nprint 1')
+
+        self.assertEqual(['push I 1', 'push I 0', 'div', 'print 1'], instructions)
+
+    def test_false_while_removed(self):
+        instructions, stats = self.optimize(
+            'label 0\npush B false\nfjmp 1\nload i\nprint 1\njmp 0\nlabel 1\npush S "end"\nprint 1'
+        )
+
+        self.assertEqual(['label 0', 'jmp 1', 'label 1', 'push S "end"', 'print 1'], instructions)
+
+    def test_true_if_becomes_straight_line(self):
+        instructions, stats = self.optimize(
+            'push I 2\npush I 1\ngt\nfjmp 0\npush S "yes"\nprint 1\njmp 1\nlabel 0\npush S "no"\nprint 1\nlabel 1'
+        )
+
+        self.assertEqual(['push S "yes"', 'print 1', 'jmp 1', 'label 1'], instructions)
+
+    def test_create_passes(self):
+        passes = optimizer.create_passes(['fold_constants', 'dead_labels'])
+
+        self.assertEqual([['fold_constants'], ['dead_labels']], [p.rules for p in passes])
+
+
+class SuperinstructionFuserTestCase(OptimizationPassTestCase):
+    optimization_pass = SuperinstructionFuser
+
+    def test_loop(self):
+        instructions, stats = self.optimize(
+            'label 0\nload i\npush I 10\nlt\nfjmp 1\nload s\nload i\nadd\nsave s\n'
+            'load i\npush I 1\nadd\nsave i\njmp 0\nlabel 1'
+        )
+
+        self.assertEqual([
+            'label 0', 'load_push_lt_fjmp i 1 I 10', 'load_load_add s i', 'save s',
+            'load_push_add_save i i I 1', 'jmp 0', 'label 1'
+        ], instructions)
+        self.assertEqual(8, stats['superinstructions'])
+
+    def test_fused_jump_keeps_label(self):
+        passes = optimizer.create_passes()
+        instructions = bytecode.parse_text('label 0\nload a\nload b\nlt\nfjmp 1\njmp 0\nlabel 1')
+        for optimization_pass in passes:
+            instructions = optimization_pass.optimize(instructions)
+
+        self.assertEqual([('label', 0), ('load_load_lt_fjmp', ('a', 'b', 1)), ('jmp', 0), ('label', 1)],
+                         instructions)
+
+
+if __name__ == '__main__':
+    unittest.main()
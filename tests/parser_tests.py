@@ -0,0 +1,35 @@
+import contextlib
+import io
+import unittest
+
+from antlr4.atn.PredictionMode import PredictionMode
+
+from main import parse, warm_up
+
+
+class ParserTestCase(unittest.TestCase):
+    def test_valid_source_stays_in_sll_mode(self):
+        parser, tree = parse('int a;\na = 1 + 2 * 3;\nwrite a;\n')
+
+        self.assertEqual(PredictionMode.SLL, parser._interp.predictionMode)
+        self.assertEqual(0, parser.getNumberOfSyntaxErrors())
+        self.assertEqual(3, len(tree.statement()))
+
+    def test_syntax_error_is_reported_after_ll_reparse(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            parser, tree = parse('int a;\na = (3 + ;\n')
+
+        self.assertEqual(PredictionMode.LL, parser._interp.predictionMode)
+        self.assertEqual(1, parser.getNumberOfSyntaxErrors())
+        self.assertIn('Line 2: 9', output.getvalue())
+
+    def test_warm_up(self):
+        warm_up()
+
+        parser, tree = parse('write "warm";')
+        self.assertEqual(0, parser.getNumberOfSyntaxErrors())
+
+
+if __name__ == '__main__':
+    unittest.main()
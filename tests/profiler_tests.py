@@ -0,0 +1,65 @@
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import bytecode
+from main import compile_source
+from profiler import ProfilingVirtualMachine, format_report, write_json
+
+SOURCE = '''int i, s;
+while (i < 10) {
+  s = s + i;
+  i = i + 1;
+}
+write s;
+'''
+
+
+class ProfilerTestCase(unittest.TestCase):
+    def profile(self, **options) -> ProfilingVirtualMachine:
+        instructions = bytecode.parse_text(compile_source(SOURCE, lines=True, **options).decode('utf-8'))
+        vm = ProfilingVirtualMachine(instructions, stdout=io.StringIO())
+        vm.execute()
+
+        self.assertEqual('45\n', vm.output.stream.getvalue())
+        return vm
+
+    def test_counts_and_lines(self):
+        report = self.profile().report()
+
+        saves = [entry for entry in report['addresses'] if entry['opcode'] == 'save' and entry['line'] == 3]
+        self.assertEqual([10], [entry['count'] for entry in saves])
+        self.assertEqual(sum(entry['count'] for entry in report['addresses']), report['instructions'])
+        self.assertEqual(report['instructions'], sum(totals['count'] for totals in report['opcodes']))
+
+    def test_hot_loops(self):
+        report = self.profile(typed=True).report()
+        [loop] = report['loops']
+
+        self.assertEqual(10, loop['iterations'])
+        self.assertEqual([2, 4], loop['lines'])
+        self.assertLessEqual(loop['time'], report['time'])
+
+    def test_reports(self):
+        report = self.profile().report()
+
+        text = format_report(report)
+        self.assertIn('opcodes:', text)
+        self.assertIn('iterations', text)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'profile.json'
+            write_json(report, path)
+            with open(path, 'r') as file:
+                self.assertEqual(report, json.load(file))
+
+    def test_line_directives_survive_binary_and_linking(self):
+        instructions = bytecode.decode(compile_source(SOURCE, binary=True, link=True, lines=True))
+
+        self.assertIn(('line', 3), instructions)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import contextlib
+import io
+import tempfile
+import unittest
+
+import bytecode
+from python_backend import PythonBackend
+from virtual_machine import VirtualMachine
+
+
+class PythonBackendTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.backend = PythonBackend(self.cache_dir.name)
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def assertSameOutput(self, byte_code: str):
+        instructions = bytecode.parse_text(byte_code)
+
+        vm_output = io.StringIO()
+        with contextlib.redirect_stdout(vm_output):
+            VirtualMachine(instructions).execute()
+
+        backend_output = io.StringIO()
+        with contextlib.redirect_stdout(backend_output):
+            self.backend.execute(instructions)
+
+        self.assertEqual(vm_output.getvalue(), backend_output.getvalue())
+        return PythonBackend.translate(instructions)
+
+    def test_while_loop_uses_native_control_flow(self):
+        source = self.assertSameOutput(
+            'push I 0\nsave i\nlabel 0\nload i\npush I 3\nlt\nfjmp 1\nload i\nprint 1\n'
+            'load i\npush I 1\nadd\nsave i\njmp 0\nlabel 1'
+        )
+
+        self.assertIn('while (v_i < 3):', source)
+        self.assertNotIn('stack', source)
+
+    def test_if_else(self):
+        source = self.assertSameOutput(
+            'push I 2\nsave x\nload x\npush I 1\ngt\nfjmp 0\npush S "big"\nprint 1\njmp 1\n'
+            'label 0\npush S "small"\nprint 1\nlabel 1'
+        )
+
+        self.assertIn('else:', source)
+
+    def test_short_circuit_conditions(self):
+        source = self.assertSameOutput(
+            'push I 0\nsave i\nlabel 0\nload i\npush I 3\nlt\nfjmp 1\nload i\npush I 1\ngt\nfjmp 2\n'
+            'jmp 3\nlabel 2\nload i\npush I 0\neq\nfjmp 4\nlabel 3\nload i\nprint 1\nlabel 4\n'
+            'load i\npush I 1\nadd\nsave i\njmp 0\nlabel 1'
+        )
+
+        self.assertIn('if ((v_i > 1) or (v_i == 0)):', source)
+        self.assertNotIn('stack', source)
+
+    def test_short_circuit_values(self):
+        source = self.assertSameOutput(
+            'push I 2\nsave i\nload i\npush I 1\ngt\nfjmp 0\nload i\npush I 3\nlt\njmp 1\nlabel 0\n'
+            'push B false\nlabel 1\nsave b\nload b\nprint 1'
+        )
+
+        self.assertIn('v_b = ((v_i < 3) if (v_i > 1) else False)', source)
+
+    def test_swap_keeps_stack_values(self):
+        self.assertSameOutput('push I 1\nsave a\npush I 2\nsave b\nload a\nload b\nsave a\nsave b\nload a\nload b\nprint 2')
+
+    def test_division_semantics(self):
+        self.assertSameOutput('push I 17\npush I 3\ndiv\npush F 17.0\npush I 2\ndiv\npush I 7\npush I 2\ndivi\nprint 3')
+
+    def test_superinstructions(self):
+        self.assertSameOutput(
+            'push I 0\nsave i\npush S ""\nsave s\nlabel 0\nload_push_lti_fjmp i 1 I 3\n'
+            'load_push_concat s S "ab c"\nsave s\nload_push_addi_save i i I 1\njmp 0\nlabel 1\nload s\nprint 1'
+        )
+
+    def test_unstructured_jumps_fall_back_to_dispatch(self):
+        source = self.assertSameOutput(
+            'push I 0\nsave i\njmp 1\nlabel 0\nload i\nprint 1\nlabel 1\nload i\npush I 1\nadd\nsave i\n'
+            'load i\npush I 4\nlt\nfjmp 2\njmp 0\nlabel 2'
+        )
+
+        self.assertIn('pc = 0', source)
+
+    def test_code_objects_are_cached(self):
+        instructions = bytecode.parse_text('push I 1\nprint 1')
+        code = self.backend.compile(instructions)
+
+        self.assertIs(code, self.backend.compile(instructions))
+        self.assertEqual(code.co_code, PythonBackend(self.cache_dir.name).compile(instructions).co_code)
+
+
+if __name__ == '__main__':
+    unittest.main()
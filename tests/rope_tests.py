@@ -0,0 +1,68 @@
+import io
+import tempfile
+import unittest
+
+import bytecode
+import optimizer
+from main import compile_source
+from python_backend import PythonBackend
+from rope import Rope, concat
+from virtual_machine import VirtualMachine
+
+
+class RopeTestCase(unittest.TestCase):
+    def test_small_strings_stay_plain(self):
+        self.assertEqual('ab', concat('a', 'b'))
+        self.assertIs(str, type(concat('a', 'b')))
+
+    def test_concat_builds_rope(self):
+        value = ''
+        for i in range(1000):
+            value = concat(value, str(i))
+
+        self.assertIs(Rope, type(value))
+        self.assertEqual(''.join(str(i) for i in range(1000)), str(value))
+
+    def test_shared_prefixes_keep_their_values(self):
+        base = concat('x' * 300, 'y' * 300)
+        left = concat(base, 'l' * 300)
+        right = concat(base, 'r' * 300)
+
+        self.assertEqual('x' * 300 + 'y' * 300, str(base))
+        self.assertEqual('x' * 300 + 'y' * 300 + 'l' * 300, str(left))
+        self.assertEqual('x' * 300 + 'y' * 300 + 'r' * 300, str(right))
+        self.assertEqual(str(left) + 'z', str(concat(left, 'z')))
+
+    def test_comparisons(self):
+        value = concat('a' * 300, 'b')
+
+        self.assertTrue(value == 'a' * 300 + 'b')
+        self.assertTrue('a' * 300 + 'b' == value)
+        self.assertFalse(value != concat('a' * 300, 'b'))
+        self.assertTrue(value < 'b')
+        self.assertTrue(value > 'a')
+
+    def test_programs_build_long_strings(self):
+        source = '''int i; string s, t;
+        while (i < 2000) { s = s . "0123456789"; i = i + 1; }
+        t = s . "!";
+        write s == t, t == (s . "!");'''
+        expected = 'False True\n'
+
+        for options in [{}, {'typed': True, 'passes': optimizer.create_passes()}]:
+            instructions = bytecode.parse_text(compile_source(source, **options).decode('utf-8'))
+
+            stdout = io.StringIO()
+            vm = VirtualMachine(instructions, stdout=stdout)
+            vm.execute()
+            self.assertEqual(expected, stdout.getvalue())
+            self.assertEqual('0123456789' * 2000, vm.vars['s'])
+
+            stdout = io.StringIO()
+            with tempfile.TemporaryDirectory() as cache_dir:
+                PythonBackend(cache_dir).execute(instructions, stdout=stdout)
+            self.assertEqual(expected, stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
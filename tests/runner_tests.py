@@ -0,0 +1,60 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import runner
+from main import compile_source
+
+
+class RunnerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+        self.program = self.path / 'divide.bc'
+        self.program.write_bytes(compile_source('int a, b;\nread a, b;\nwrite a / b;\n', binary=True))
+        self.inputs = []
+        for index, text in enumerate(['7\n2\n', '9\n3\n', '1\n0\n', '5\n']):
+            self.inputs.append(self.path / 'input{}.txt'.format(index))
+            self.inputs[-1].write_text(text)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_run_jobs(self):
+        for workers in [1, 2]:
+            results = runner.run_jobs([(self.program, input_path) for input_path in self.inputs], workers)
+
+            self.assertEqual(['3\n', '3\n', '', ''], [result['output'] for result in results])
+            self.assertEqual([0, 0, 1, 1], [result['status'] for result in results])
+            self.assertIn('ZeroDivisionError', results[2]['error'])
+            self.assertIn('EOFError', results[3]['error'])
+
+    def test_programs_are_loaded_once(self):
+        runner.run_job((self.program, self.inputs[0]))
+        vm = runner.load_program(self.program)
+
+        result = runner.run_job((self.program, self.inputs[1]))
+        self.assertIs(vm, runner.load_program(self.program))
+        self.assertEqual('3\n', result['output'])
+
+    def test_missing_program(self):
+        result = runner.run_job((self.path / 'missing.bc', None))
+
+        self.assertEqual(1, result['status'])
+        self.assertIn('FileNotFoundError', result['error'])
+
+    def test_jobs_file_and_summary(self):
+        jobs_file = self.path / 'jobs.txt'
+        jobs_file.write_text('{} {}\n\n{}\n'.format(self.program, self.inputs[0], self.program))
+        jobs = runner.read_jobs(jobs_file)
+        self.assertEqual([(str(self.program), str(self.inputs[0])), (str(self.program), None)], jobs)
+
+        results = runner.run_jobs(jobs, 1)
+        report = runner.summary(results, 0.5)
+        self.assertEqual((2, 1, 4.0), (report['jobs'], report['failed'], report['jobs_per_second']))
+        self.assertIn('2 jobs (1 failed)', runner.format_summary(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
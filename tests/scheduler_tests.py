@@ -0,0 +1,105 @@
+import asyncio
+import io
+import unittest
+
+from main import compile_source
+from scheduler import FAILED, KILLED, Scheduler
+from streams import Channel
+from virtual_machine import BLOCKED, FINISHED, PAUSED, VirtualMachine
+
+
+def compile_text(source: str) -> str:
+    return compile_source(source).decode('utf-8')
+
+
+COUNTER = compile_text('int i; while (i < 50) { i = i + 1; } write i;')
+ECHO = compile_text('int a; read a; while (a > 0) { write a * 2; read a; } write "bye";')
+
+
+class ResumableVirtualMachineTestCase(unittest.TestCase):
+    def test_run_with_budget(self):
+        stdout = io.StringIO()
+        vm = VirtualMachine(COUNTER, stdout=stdout)
+
+        self.assertEqual(PAUSED, vm.run(100))
+        self.assertEqual(100, vm.executed)
+        self.assertEqual('', stdout.getvalue())
+
+        while vm.run(7) == PAUSED:
+            pass
+        self.assertEqual('50\n', stdout.getvalue())
+
+    def test_blocks_on_read(self):
+        channel = Channel()
+        stdout = io.StringIO()
+        vm = VirtualMachine(ECHO, stdin=channel, stdout=stdout)
+
+        self.assertEqual(BLOCKED, vm.run())
+        channel.send('2\n4')
+        self.assertEqual(BLOCKED, vm.run())
+        self.assertEqual('4\n', stdout.getvalue())
+
+        channel.send('\n0\n')
+        self.assertEqual(FINISHED, vm.run())
+        self.assertEqual('4\n8\nbye\n', stdout.getvalue())
+
+
+class SchedulerTestCase(unittest.TestCase):
+    def test_round_robin(self):
+        scheduler = Scheduler(quantum=10)
+        outputs = [io.StringIO() for _ in range(20)]
+        for output in outputs:
+            scheduler.spawn(COUNTER, stdout=output)
+
+        scheduler.step()
+        scheduler.step()
+        self.assertEqual([10, 10, 0], [task.vm.executed for task in scheduler.tasks[:3]])
+
+        tasks = scheduler.run()
+        self.assertEqual([FINISHED] * 20, [task.status for task in tasks])
+        self.assertEqual(['50\n'] * 20, [output.getvalue() for output in outputs])
+
+    def test_priority_scales_the_quantum(self):
+        scheduler = Scheduler(quantum=10)
+        low = scheduler.spawn(COUNTER, stdout=io.StringIO())
+        high = scheduler.spawn(COUNTER, stdout=io.StringIO(), priority=3)
+
+        scheduler.step()
+        scheduler.step()
+        self.assertEqual((10, 30), (low.vm.executed, high.vm.executed))
+
+    def test_instruction_limit_and_failures(self):
+        scheduler = Scheduler(quantum=100)
+        runaway = scheduler.spawn(compile_text('int i; while (true) { i = i + 1; }'), limit=1000)
+        failing = scheduler.spawn(compile_text('int a; read a; write 1 / a;'), stdin='0\n', stdout=io.StringIO())
+        counter = scheduler.spawn(COUNTER, stdout=io.StringIO())
+
+        scheduler.run()
+        self.assertEqual((KILLED, 1000), (runaway.status, runaway.vm.executed))
+        self.assertEqual(FAILED, failing.status)
+        self.assertIn('ZeroDivisionError', failing.error)
+        self.assertEqual(FINISHED, counter.status)
+
+    def test_async_input(self):
+        async def run():
+            scheduler = Scheduler()
+            channel = Channel()
+            stdout = io.StringIO()
+            echo = scheduler.spawn(ECHO, stdin=channel, stdout=stdout)
+            scheduler.spawn(COUNTER, stdout=io.StringIO())
+
+            async def produce():
+                for line in ['3\n', '5\n', '0\n']:
+                    await asyncio.sleep(0)
+                    channel.send(line)
+
+            await asyncio.gather(scheduler.run_async(), produce())
+            return echo, stdout.getvalue()
+
+        echo, output = asyncio.run(run())
+        self.assertEqual(FINISHED, echo.status)
+        self.assertEqual('6\n10\nbye\n', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
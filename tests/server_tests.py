@@ -0,0 +1,105 @@
+import base64
+import socketserver
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import optimizer
+import server
+from compile_cache import CompileCache
+from main import compile_source
+
+
+class CompileServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket = Path(self.directory.name) / 'compile.sock'
+        self.server = server.CompileServer(self.socket, CompileCache(Path(self.directory.name) / 'cache'))
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def compile(self, source: str, **options) -> dict:
+        return server.request({'command': 'compile', 'source': source, 'options': options}, self.socket)
+
+    def test_compile(self):
+        source = (Path(__file__).parent.parent / 'examples' / 'example03.txt').read_text()
+
+        for options in [{}, {'binary': True, 'optimize': True, 'link': True}]:
+            response = self.compile(source, **options)
+            self.assertTrue(response['ok'])
+            self.assertFalse(response['cached'])
+
+            passes = optimizer.create_passes() if options.get('optimize') else None
+            expected = compile_source(source, options.get('binary', False), passes, link=options.get('link', False))
+            self.assertEqual(expected, base64.b64decode(response['bytecode']))
+
+        self.assertTrue(self.compile(source)['cached'])
+
+    def test_errors(self):
+        response = self.compile('int a;\na = "x";')
+        self.assertEqual((False, 1), (response['ok'], response['exit']))
+        self.assertIn('Type errors:', response['messages'])
+
+        response = self.compile('int a a;')
+        self.assertEqual((False, 0), (response['ok'], response['exit']))
+        self.assertIn("extraneous input 'a'", response['messages'])
+
+        response = server.request({'command': 'unknown'}, self.socket)
+        self.assertIn('Bad request', response['messages'])
+
+    def test_compiler_crash(self):
+        with mock.patch('server.compile_source', side_effect=KeyError('c')):
+            response = self.compile('read c;')
+        self.assertEqual((False, 1), (response['ok'], response['exit']))
+        self.assertIn('KeyError', response['messages'])
+        self.assertTrue(self.compile('write 1;')['ok'])
+
+    def test_incomplete_response(self):
+        class Hangup(socketserver.StreamRequestHandler):
+            def handle(self):
+                self.rfile.readline()
+                self.wfile.write(b'{"ok": tr')
+
+        path = Path(self.directory.name) / 'hangup.sock'
+        with socketserver.UnixStreamServer(str(path), Hangup) as hangup:
+            thread = threading.Thread(target=hangup.handle_request)
+            thread.start()
+            with self.assertRaises(ValueError):
+                server.request({'command': 'stats'}, path)
+            thread.join()
+
+    def test_refuses_running_server(self):
+        with self.assertRaises(OSError):
+            server.CompileServer(self.socket)
+        self.assertTrue(self.compile('write 1;')['ok'])
+
+    def test_rejects_shared_directory(self):
+        shared = Path(self.directory.name) / 'shared'
+        shared.mkdir(mode=0o777)
+        shared.chmod(0o777)
+        with self.assertRaises(PermissionError):
+            server.CompileServer(shared / 'compile.sock')
+        with self.assertRaises(PermissionError):
+            server.request({'command': 'stats'}, shared / 'compile.sock')
+
+    def test_stats(self):
+        self.compile('write 1;')
+        self.compile('write 1;')
+        stats = server.request({'command': 'stats'}, self.socket)['stats']
+
+        self.assertEqual((2, 0, 1, 1), (stats['requests'], stats['failures'], stats['cache_hits'],
+                                        stats['cache_misses']))
+        self.assertGreater(stats['latency_max'], 0)
+        self.assertIn('2 requests (0 failed)', server.format_stats(stats))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import io
+import unittest
+
+from streams import InputReader, OutputBuffer
+from virtual_machine import VirtualMachine
+
+
+class OutputBufferTestCase(unittest.TestCase):
+    def test_flushes_on_size(self):
+        stream = io.StringIO()
+        output = OutputBuffer(stream, size=8)
+
+        output.write('abc\n')
+        self.assertEqual('', stream.getvalue())
+
+        output.write('defgh\n')
+        self.assertEqual('abc\ndefgh\n', stream.getvalue())
+
+    def test_flush(self):
+        stream = io.StringIO()
+        output = OutputBuffer(stream)
+        output.write('abc\n')
+        output.flush()
+
+        self.assertEqual('abc\n', stream.getvalue())
+
+
+class InputReaderTestCase(unittest.TestCase):
+    def test_lines_across_chunks(self):
+        reader = InputReader(io.StringIO('first\nsecond line\nlast'), chunk_size=4)
+
+        self.assertEqual(['first', 'second line', 'last'], [reader.readline() for _ in range(3)])
+        self.assertRaises(EOFError, reader.readline)
+
+    def test_flushes_output_before_read(self):
+        stream = io.StringIO()
+        output = OutputBuffer(stream)
+        reader = InputReader(io.StringIO('1\n'), output)
+
+        output.write('prompt\n')
+        reader.readline()
+        self.assertEqual('prompt\n', stream.getvalue())
+
+
+class VirtualMachineStreamsTestCase(unittest.TestCase):
+    def test_in_memory_streams(self):
+        stdout = io.StringIO()
+        vm = VirtualMachine('read I\nread S\nprint 2\nread B\nprint 1',
+                            stdin=io.StringIO('7\nhello world\ntrue\n'), stdout=stdout)
+        vm.execute()
+
+        self.assertEqual('7 hello world\nTrue\n', stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
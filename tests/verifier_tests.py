@@ -0,0 +1,52 @@
+import contextlib
+import io
+import unittest
+from pathlib import Path
+
+import bytecode
+import verifier
+from bytecode import BytecodeError
+from main import compile_source
+from virtual_machine import VirtualMachine
+
+
+class VerifierTestCase(unittest.TestCase):
+    def verify(self, byte_code: str) -> int:
+        return verifier.verify(bytecode.parse_text(byte_code))
+
+    def test_max_depth(self):
+        self.assertEqual(3, self.verify('push I 1\npush I 2\npush I 3\nadd\nprint 2'))
+
+    def test_superinstructions(self):
+        self.assertEqual(2, self.verify('load_load_add a b\nsave c'))
+        self.assertEqual(2, self.verify('label 0\nload_push_lt_fjmp i 1 I 3\njmp 0\nlabel 1'))
+
+    def test_underflow(self):
+        with self.assertRaisesRegex(BytecodeError, r'Stack underflow at instruction 1 \(add\)'):
+            self.verify('push I 1\nadd')
+
+    def test_inconsistent_depth(self):
+        with self.assertRaisesRegex(BytecodeError, 'Inconsistent stack depth at instruction 3: 0 and 1'):
+            self.verify('push B true\nfjmp 0\npush I 1\nlabel 0\nprint 1')
+
+    def test_loop_must_not_grow_stack(self):
+        with self.assertRaisesRegex(BytecodeError, 'Inconsistent stack depth'):
+            self.verify('label 0\npush I 1\njmp 0')
+
+    def test_compiled_examples(self):
+        base_dir = Path(__file__).parent.parent
+        for name in ['example01.txt', 'example02.txt', 'example03.txt']:
+            with open(base_dir / 'examples' / name, 'r') as file:
+                instructions = bytecode.parse_text(compile_source(file.read()).decode('utf-8'))
+            self.assertGreater(verifier.verify(instructions), 0)
+
+    def test_virtual_machine_rejects_unverifiable_code(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertRaises(SystemExit):
+            VirtualMachine('push I 1\nprint 2')
+
+        self.assertIn('ERROR: Stack underflow', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import contextlib
+import io
+import unittest
+
+from virtual_machine import VirtualMachine
+
+
+class VirtualMachineTestCase(unittest.TestCase):
+    def run_vm(self, byte_code: str):
+        vm = VirtualMachine(byte_code)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            vm.execute()
+
+        return vm, output.getvalue()
+
+    def test_named_variables_get_slots(self):
+        vm, output = self.run_vm('push I 1\nsave x\npush S "a"\nsave y\nload x\nload y\nprint 2')
+
+        self.assertEqual('1 a\n', output)
+        self.assertEqual(['x', 'y'], vm.symbols)
+        self.assertEqual({'x': 1, 'y': 'a'}, vm.vars)
+
+    def test_slot_variables(self):
+        vm, output = self.run_vm('var 0 x\nvar 1 y\npush I 1\nsave 1\nload 1\nsave 0\nload 0\nprint 1')
+
+        self.assertEqual('1\n', output)
+        self.assertEqual([1, 1], vm.slots)
+        self.assertEqual({'x': 1, 'y': 1}, vm.vars)
+
+
+    def test_sub_operand_order(self):
+        vm, output = self.run_vm('push I 5\npush I 3\nsub\npush F 5.0\npush I 3\nsubf\nprint 2')
+
+        self.assertEqual('2 2.0\n', output)
+
+    def test_typed_opcodes(self):
+        vm, output = self.run_vm(
+            'push I 17\npush I 3\ndivi\npush F 17.0\npush I 2\ndivf\npush I 1\npush F 1.5\nltf\n'
+            'push S "a"\npush S "b"\nneqs\nprint 4'
+        )
+
+        self.assertEqual('5 8.5 True True\n', output)
+
+
+    def test_superinstructions(self):
+        vm, output = self.run_vm(
+            'push I 0\nsave i\npush S ""\nsave s\nlabel 0\nload_push_lti_fjmp i 1 I 3\n'
+            'load_push_concat s S "ab c"\nsave s\nload_push_addi_save i i I 1\njmp 0\nlabel 1\nload s\nprint 1'
+        )
+
+        self.assertEqual('ab cab cab c\n', output)
+        self.assertEqual({'i': 3, 's': 'ab cab cab c'}, vm.vars)
+
+    def test_load_keeps_variables(self):
+        vm, output = self.run_vm('push I 2\nsave x')
+        vm.load('load x\npush I 3\nmuli\nsave y\nload x\nload y\nprint 2')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            vm.execute()
+
+        self.assertEqual('2 6\n', output.getvalue())
+        self.assertEqual({'x': 2, 'y': 6}, vm.vars)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+
+import ir
+from main import parse
+from visitors import MyVisitor, TypeChecker
+
+
+class TypeCheckerTestCase(unittest.TestCase):
+    def check(self, source: str):
+        parser, tree = parse(source)
+        program = ir.lower(tree)
+        type_checker = TypeChecker()
+        type_checker.visit(program)
+
+        return program, type_checker
+
+    def test_expressions_are_annotated_with_types(self):
+        program, type_checker = self.check('int a; float f; a = 7 / 2; f = a * 1.5; write a < f, "x" . "y";')
+
+        division = program.statements[2].expression
+        product = program.statements[3].expression
+        comparison, concatenation = program.statements[4].expressions
+
+        self.assertEqual([], type_checker.type_errors)
+        self.assertIs(int, division.type)
+        self.assertIs(float, product.type)
+        self.assertIs(bool, comparison.type)
+        self.assertIs(str, concatenation.type)
+
+    def test_division_by_zero_is_not_evaluated(self):
+        program, type_checker = self.check('int a; a = 10 / 0;')
+
+        self.assertEqual([], type_checker.type_errors)
+
+    def test_type_errors(self):
+        program, type_checker = self.check(
+            'int x; string s; x = 13.25; s = 1; write 20 % 3.0, "abc" . 10; y = 1;'
+        )
+
+        self.assertEqual([
+            'Trying to assign float to int',
+            'Trying to assign int to string at 1:28',
+            'Mod used with int and float',
+            'Trying to concatenate str and int',
+            'y was not declared',
+        ], type_checker.type_errors)
+
+    def test_undeclared_and_mismatched_operands(self):
+        program, type_checker = self.check('int a; a = b + 1; a = 1 + true; write x . "a"; a = c; read a, y;')
+
+        self.assertEqual([
+            'b was not declared',
+            'Undefined operation + for int and bool',
+            'x was not declared',
+            'c was not declared',
+            'y was not declared',
+        ], type_checker.type_errors)
+
+    def test_comparison_operands(self):
+        program, type_checker = self.check(
+            'bool b; b = 1 < "a"; b = true > false; b = "a" == 1; b = 1 == 2.5; b = "a" != "b"; b = true == b;'
+        )
+
+        self.assertEqual([
+            'Cannot compare int and str with <',
+            'Cannot compare bool and bool with >',
+            'Cannot compare str and int with ==',
+        ], type_checker.type_errors)
+
+    def test_code_generation_uses_annotations(self):
+        program, type_checker = self.check('float y; int i; y = 10; write y * 2, i < y;')
+
+        instructions = MyVisitor(typed=True).visit(program)
+        self.assertEqual(
+            ['push F 0.0', 'save y', 'push I 0', 'save i', 'push I 10', 'itof', 'save y', 'load y', 'pop',
+             'load y', 'push I 2', 'itof', 'mulf', 'load i', 'itof', 'load y', 'ltf', 'print 2'],
+            instructions
+        )
+
+    def test_short_circuit_branches(self):
+        program, type_checker = self.check('int i; if ((i > 1) && (i < 3) || (i == 0)) { write i; }')
+
+        instructions = MyVisitor().visit(program)
+        self.assertEqual(
+            ['push I 0', 'save i', 'load i', 'push I 1', 'gt', 'fjmp 1', 'load i', 'push I 3', 'lt', 'fjmp 1',
+             'jmp 2', 'label 1', 'load i', 'push I 0', 'eq', 'fjmp 0', 'label 2', 'load i', 'print 1',
+             'jmp 3', 'label 0', 'label 3'],
+            instructions
+        )
+        self.assertNotIn('and', instructions)
+
+    def test_short_circuit_values(self):
+        program, type_checker = self.check('bool a, b; a = b && (1 < 2); b = a || true;')
+
+        instructions = MyVisitor().visit(program)
+        self.assertEqual(
+            ['load b', 'fjmp 0', 'push I 1', 'push I 2', 'lt', 'jmp 1', 'label 0', 'push B false', 'label 1',
+             'save a', 'load a', 'pop', 'load a', 'push B true', 'or', 'save b', 'load b', 'pop'],
+            instructions[4:]
+        )
+
+    def test_stream_one_statement_at_a_time(self):
+        source = 'int a; if (a < 1) { string s; a = 2; } write a;'
+        program, type_checker = self.check(source)
+        expected = MyVisitor(slots=True).visit(program)
+
+        program, type_checker = self.check(source)
+        chunks = list(MyVisitor(slots=True).stream(program))
+        self.assertEqual(['var 0 a', 'var 1 s'], chunks[0])
+        self.assertEqual(4, len(chunks))
+        self.assertEqual(expected, [instruction for chunk in chunks for instruction in chunk])
+        self.assertEqual([], program.statements)
+
+
+class LoweringTestCase(unittest.TestCase):
+    def test_lowering(self):
+        parser, tree = parse('int a; ; if (a < 1) { a = -2; } while (!true) { write "x" . "y"; }')
+        program = ir.lower(tree)
+
+        declaration, condition, loop = program.statements
+        self.assertEqual(('int', ['a']), (declaration.type_name, declaration.names))
+        self.assertEqual('<', condition.condition.op)
+        self.assertEqual([], condition.else_body)
+        self.assertIsInstance(loop.condition, ir.Not)
+        self.assertEqual('.', loop.body[0].expressions[0].op)
+
+    def test_nodes_use_slots(self):
+        parser, tree = parse('int a; a = 1 + 2;')
+        program = ir.lower(tree)
+
+        self.assertFalse(hasattr(program.statements[1].expression, '__dict__'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import argparse
+
+import assembler
+import bytecode
+from bytecode import BytecodeError
+
+
+def stack_effect(opcode: str, args) -> tuple:
+    depth = needed = peak = 0
+    for component, component_args in bytecode.expand(opcode, args):
+        pops, pushes = (component_args, 0) if component == 'print' else bytecode.STACK_EFFECTS[component]
+        depth -= pops
+        needed = max(needed, -depth)
+        depth += pushes
+        peak = max(peak, depth)
+
+    return needed, peak, depth
+
+
+def verify(instructions: list) -> int:
+    code = [(opcode, args) for opcode, args in assembler.link(instructions) if opcode not in bytecode.DIRECTIVES]
+
+    depths = [None] * (len(code) + 1)
+    depths[0] = 0
+    pending = [0]
+    max_depth = 0
+    while pending:
+        position = pending.pop()
+        if position == len(code):
+            continue
+
+        opcode, args = code[position]
+        depth = depths[position]
+        needed, peak, change = stack_effect(opcode, args)
+        if depth < needed:
+            raise BytecodeError('Stack underflow at instruction {} ({})'.format(position, opcode))
+        max_depth = max(max_depth, depth + peak)
+
+        successors = bytecode.operands_of_kind(opcode, args, 'label')
+        if opcode != 'jmp':
+            successors.append(position + 1)
+
+        for successor in successors:
+            if depths[successor] is None:
+                depths[successor] = depth + change
+                pending.append(successor)
+            elif depths[successor] != depth + change:
+                raise BytecodeError('Inconsistent stack depth at instruction {}: {} and {}'.format(
+                    successor, depths[successor], depth + change
+                ))
+
+    return max_depth
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Check stack depths of PJP bytecode')
+    arg_parser.add_argument('bytecode', help='bytecode path (text or binary)')
+    args = arg_parser.parse_args()
+
+    try:
+        print('max stack depth: {}'.format(verify(bytecode.load(args.bytecode))))
+    except BytecodeError as e:
+        print('ERROR: {}'.format(e))
+        exit(1)
@@ -1,33 +1,113 @@
-import sys
+import argparse
+import operator
+
+import assembler
+import bytecode
+import verifier
+from bytecode import BytecodeError
+from rope import concat
+from streams import InputReader, OutputBuffer
+
+FINISHED = 'finished'
+PAUSED = 'paused'
+BLOCKED = 'blocked'
+
+
+def divide(left, right):
+    if type(right) is int and type(right) == type(left):
+        return left // right
+    else:
+        return left / right
+
+
+BINARY_OPERATORS = {
+    'add': operator.add,
+    'sub': operator.sub,
+    'mul': operator.mul,
+    'div': divide,
+    'mod': operator.mod,
+    'concat': concat,
+    'and': lambda left, right: left and right,
+    'or': lambda left, right: left or right,
+    'gt': operator.gt,
+    'lt': operator.lt,
+    'eq': operator.eq,
+    'neq': operator.ne,
+    'addi': operator.add,
+    'addf': operator.add,
+    'subi': operator.sub,
+    'subf': operator.sub,
+    'muli': operator.mul,
+    'mulf': operator.mul,
+    'divi': operator.floordiv,
+    'divf': operator.truediv,
+    'modi': operator.mod,
+    'lti': operator.lt,
+    'ltf': operator.lt,
+    'gti': operator.gt,
+    'gtf': operator.gt,
+    'eqi': operator.eq,
+    'eqf': operator.eq,
+    'eqs': operator.eq,
+    'eqb': operator.eq,
+    'neqi': operator.ne,
+    'neqf': operator.ne,
+    'neqs': operator.ne,
+    'neqb': operator.ne,
+}
 
 
 class VirtualMachine:
-    def __init__(self, byte_code: str):
+    def __init__(self, byte_code: str | list, stdin=None, stdout=None, buffer_size: int = OutputBuffer.DEFAULT_SIZE):
         self.stack = []
-        self.vars = {}
-        self.jumps = {}
+        self.slots = []
+        self.symbols = []
+        self.slot_names = {}
+        self.max_stack_depth = 0
         self.current_line = 0
-        self.instructions = byte_code.split('\n')
+        self.executed = 0
+        self.output = OutputBuffer(stdout, buffer_size)
+        self.input = InputReader(stdin, self.output)
+
+        try:
+            if isinstance(byte_code, str):
+                byte_code = bytecode.parse_text(byte_code)
+        except BytecodeError as e:
+            print('ERROR: {}'.format(e))
+            exit(1)
 
-        self.exec_methods = []
+        self.instructions = byte_code
+
+        self.exec_methods = {}
         for name in dir(self):
             if name.startswith('exec_'):
                 method = getattr(self, name)
                 if callable(method):
-                    self.exec_methods.append(method)
-
-    @staticmethod
-    def autoconvert_bytecode_type(value, _type):
-        if _type == 'F':
-            return float(value)
-        elif _type == 'I':
-            return int(value)
-        elif _type == 'S':
-            return str(value)[1:-1]
-        elif _type == 'B':
-            return value == 'true'
-        else:
-            print('ERROR: Undefined type {}'.format(_type))
+                    self.exec_methods[name[len('exec_'):]] = method
+
+        self.fuse_methods = {
+            'load_load_{}': self.fuse_load_load,
+            'load_push_{}': self.fuse_load_push,
+            'push_{}': self.fuse_push,
+            '{}_fjmp': self.fuse_fjmp,
+            'load_load_{}_fjmp': self.fuse_load_load_fjmp,
+            'load_push_{}_fjmp': self.fuse_load_push_fjmp,
+            'load_push_{}_save': self.fuse_load_push_save,
+        }
+
+        self.program = []
+        self.decode()
+
+    @property
+    def vars(self):
+        return dict(zip(self.symbols, self.slots))
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        try:
+            return cls(bytecode.load(path), **kwargs)
+        except BytecodeError as e:
+            print('ERROR: {}'.format(e))
             exit(1)
 
     @staticmethod
@@ -51,8 +131,8 @@ class VirtualMachine:
         self.stack.append(left + right)
 
     def exec_sub(self, args: str | None):
-        left = self.stack.pop()
         right = self.stack.pop()
+        left = self.stack.pop()
 
         self.stack.append(left - right)
 
@@ -84,7 +164,7 @@ class VirtualMachine:
         right = self.stack.pop()
         left = self.stack.pop()
 
-        self.stack.append(left + right)
+        self.stack.append(concat(left, right))
 
     def exec_and(self, args: str | None):
         right = self.stack.pop()
@@ -116,76 +196,292 @@ class VirtualMachine:
 
         self.stack.append(left == right)
 
+    def exec_neq(self, args: str | None):
+        right = self.stack.pop()
+        left = self.stack.pop()
+
+        self.stack.append(left != right)
+
+    def exec_addi(self, args: str | None):
+        right = self.stack.pop()
+        self.stack[-1] = self.stack[-1] + right
+
+    exec_addf = exec_addi
+
+    def exec_subi(self, args: str | None):
+        right = self.stack.pop()
+        self.stack[-1] = self.stack[-1] - right
+
+    exec_subf = exec_subi
+
+    def exec_muli(self, args: str | None):
+        right = self.stack.pop()
+        self.stack[-1] = self.stack[-1] * right
+
+    exec_mulf = exec_muli
+
+    def exec_divi(self, args: str | None):
+        right = self.stack.pop()
+        self.stack[-1] = self.stack[-1] // right
+
+    def exec_divf(self, args: str | None):
+        right = self.stack.pop()
+        self.stack[-1] = self.stack[-1] / right
+
+    def exec_modi(self, args: str | None):
+        right = self.stack.pop()
+        self.stack[-1] = self.stack[-1] % right
+
+    def exec_lti(self, args: str | None):
+        right = self.stack.pop()
+        self.stack[-1] = self.stack[-1] < right
+
+    exec_ltf = exec_lti
+
+    def exec_gti(self, args: str | None):
+        right = self.stack.pop()
+        self.stack[-1] = self.stack[-1] > right
+
+    exec_gtf = exec_gti
+
+    def exec_eqi(self, args: str | None):
+        right = self.stack.pop()
+        self.stack[-1] = self.stack[-1] == right
+
+    exec_eqf = exec_eqi
+    exec_eqs = exec_eqi
+    exec_eqb = exec_eqi
+
+    def exec_neqi(self, args: str | None):
+        right = self.stack.pop()
+        self.stack[-1] = self.stack[-1] != right
+
+    exec_neqf = exec_neqi
+    exec_neqs = exec_neqi
+    exec_neqb = exec_neqi
+
     def exec_not(self, args: str | None):
         self.stack.append(not self.stack.pop())
 
     def exec_itof(self, args: str | None):
         self.stack.append(float(self.stack.pop()))
 
-    def exec_push(self, args: str | None):
-        [_type, value] = args.split(' ', 1)
-
-        self.stack.append(self.autoconvert_bytecode_type(value, _type))
+    def exec_push(self, args: int | float | str | bool):
+        self.stack.append(args)
 
     def exec_pop(self, args: str | None):
         self.stack.pop()
 
-    def exec_load(self, args: str | None):
-        self.stack.append(self.vars[str(args)])
+    def exec_load(self, args: int):
+        self.stack.append(self.slots[args])
 
-    def exec_save(self, args: str | None):
-        self.vars[str(args)] = self.stack.pop()
+    def exec_save(self, args: int):
+        self.slots[args] = self.stack.pop()
 
-    def exec_jmp(self, args: str | None):
-        self.current_line = self.jumps[int(args)]
+    def exec_jmp(self, args: int):
+        self.current_line = args
 
-    def exec_fjmp(self, args: str | None):
+    def exec_fjmp(self, args: int):
         if not self.stack.pop():
-            self.current_line = self.jumps[int(args)]
+            self.current_line = args
 
-    def exec_print(self, args: str | None):
-        values = []
-        for i in range(int(args)):
-            values.append(self.stack.pop())
+    def exec_print(self, args: int):
+        values = self.stack[len(self.stack) - args:]
+        del self.stack[len(self.stack) - args:]
 
-        print(" ".join(map(str, reversed(values))))
+        self.output.write(' '.join(map(str, values)) + '\n')
 
-    def exec_read(self, args: str | None):
-        target_type = self.bytecode_type_2_type(str(args))
+    def exec_read(self, args: type):
+        target_type = args
 
-        value = input()
+        value = self.input.readline()
 
         if target_type is bool:
             value = value == 'true'
 
         self.stack.append(target_type(value))
 
-    def execute(self):
-        self.calculate_labels()
+    def fuse_load_load(self, function):
+        def handler(args: tuple):
+            self.stack.append(function(self.slots[args[0]], self.slots[args[1]]))
+        return handler
+
+    def fuse_load_push(self, function):
+        def handler(args: tuple):
+            self.stack.append(function(self.slots[args[0]], args[1]))
+        return handler
+
+    def fuse_push(self, function):
+        def handler(args: tuple):
+            self.stack[-1] = function(self.stack[-1], args[0])
+        return handler
+
+    def fuse_fjmp(self, function):
+        def handler(args: tuple):
+            right = self.stack.pop()
+            if not function(self.stack.pop(), right):
+                self.current_line = args[0]
+        return handler
+
+    def fuse_load_load_fjmp(self, function):
+        def handler(args: tuple):
+            if not function(self.slots[args[0]], self.slots[args[1]]):
+                self.current_line = args[2]
+        return handler
+
+    def fuse_load_push_fjmp(self, function):
+        def handler(args: tuple):
+            if not function(self.slots[args[0]], args[2]):
+                self.current_line = args[1]
+        return handler
+
+    def fuse_load_push_save(self, function):
+        def handler(args: tuple):
+            self.slots[args[1]] = function(self.slots[args[0]], args[2])
+        return handler
+
+    def get_method(self, opcode: str):
+        if opcode not in self.exec_methods:
+            family, binary_opcode, components = bytecode.SUPERINSTRUCTIONS[opcode]
+            self.exec_methods[opcode] = self.fuse_methods[family](BINARY_OPERATORS[binary_opcode])
+
+        return self.exec_methods[opcode]
+
+    def decode_operand(self, kind: str, value):
+        if kind == 'var' and type(value) is str:
+            if value not in self.slot_names:
+                self.slot_names[value] = len(self.symbols)
+                self.symbols.append(value)
+            return self.slot_names[value]
+        elif kind == 'type':
+            return self.bytecode_type_2_type(value)
+        return value
+
+    def decode(self):
+        try:
+            instructions = assembler.link(self.instructions)
+            self.max_stack_depth = verifier.verify(instructions)
+        except BytecodeError as e:
+            print('ERROR: {}'.format(e))
+            exit(1)
 
-        while self.current_line < len(self.instructions):
-            instruction_str = self.instructions[self.current_line]
-            self.current_line = self.current_line + 1
-            instruction_split = instruction_str.split(' ', 1)
-            instruction_args = None if len(instruction_split) == 1 else instruction_split[1]
+        code = []
+        for opcode, instruction_args in instructions:
+            if opcode == 'var':
+                [slot, name] = instruction_args
+                self.symbols.extend([None] * (slot + 1 - len(self.symbols)))
+                self.symbols[slot] = name
+            elif opcode not in bytecode.DIRECTIVES:
+                code.append((opcode, instruction_args))
+
+        self.slot_names = {name: slot for slot, name in enumerate(self.symbols)}
+        self.program = []
+        for opcode, instruction_args in code:
+            kind = bytecode.OPERAND_KINDS.get(opcode)
+            if type(kind) is tuple:
+                instruction_args = tuple(self.decode_operand(component_kind, value)
+                                         for component_kind, value in zip(kind, instruction_args))
+            elif kind is not None:
+                instruction_args = self.decode_operand(kind, instruction_args)
+
+            self.program.append((self.get_method(opcode), instruction_args))
+
+        self.slots.extend([None] * (len(self.symbols) - len(self.slots)))
+
+    def load(self, byte_code: str | list):
+        try:
+            if isinstance(byte_code, str):
+                byte_code = bytecode.parse_text(byte_code)
+        except BytecodeError as e:
+            print('ERROR: {}'.format(e))
+            exit(1)
 
-            for method in self.exec_methods:
-                if method.__name__ == 'exec_' + instruction_split[0]:
-                    method(instruction_args)
-                    break
+        self.instructions = byte_code
+        self.stack = []
+        self.current_line = 0
+        self.decode()
 
-    def calculate_labels(self):
-        for i, instruction_str in enumerate(self.instructions):
-            instruction_split = instruction_str.split(' ', 1)
+    def reset(self, stdin=None, stdout=None):
+        self.stack = []
+        self.slots = [None] * len(self.symbols)
+        self.current_line = 0
+        self.executed = 0
+        self.output = OutputBuffer(stdout, self.output.size)
+        self.input = InputReader(stdin, self.output)
 
-            if instruction_split[0] == 'label':
-                self.jumps[int(instruction_split[1])] = i
+    def execute(self):
+        try:
+            self.interpret()
+        finally:
+            self.output.flush()
+
+    def run(self, budget: int | None = None) -> str:
+        program = self.program
+        program_length = len(program)
+        steps = 0
+
+        try:
+            while self.current_line < program_length:
+                if steps == budget:
+                    return PAUSED
+                method, instruction_args = program[self.current_line]
+                self.current_line = self.current_line + 1
+                method(instruction_args)
+                steps += 1
+        except BlockingIOError:
+            self.current_line -= 1
+            return BLOCKED
+        finally:
+            self.executed += steps
+
+        self.output.flush()
+        return FINISHED
+
+    def interpret(self):
+        program = self.program
+        program_length = len(program)
+
+        while self.current_line < program_length:
+            method, instruction_args = program[self.current_line]
+            self.current_line = self.current_line + 1
+            method(instruction_args)
 
 
 if __name__ == '__main__':
-    if len(sys.argv) == 2:
-        with open(sys.argv[1], 'r') as file:
-            vm = VirtualMachine(file.read())
-            vm.execute()
+    arg_parser = argparse.ArgumentParser(description='Run PJP bytecode')
+    arg_parser.add_argument('bytecode', help='bytecode path (text or binary)')
+    arg_parser.add_argument('--engine', choices=['vm', 'python'], default='vm',
+                            help='interpret the bytecode or run it as a compiled Python function')
+    arg_parser.add_argument('--profile', action='store_true',
+                            help='report per-opcode, per-instruction and per-loop counts and times on stderr')
+    arg_parser.add_argument('--profile-json', help='also write the profile report to this JSON file')
+    args = arg_parser.parse_args()
+
+    if (args.profile or args.profile_json) and args.engine != 'vm':
+        arg_parser.error('profiling requires --engine vm')
+
+    if args.engine == 'python':
+        from python_backend import PythonBackend
+
+        try:
+            instructions = bytecode.load(args.bytecode)
+            verifier.verify(instructions)
+        except BytecodeError as e:
+            print('ERROR: {}'.format(e))
+            exit(1)
+        PythonBackend().execute(instructions)
+    elif args.profile or args.profile_json:
+        import sys
+
+        from profiler import ProfilingVirtualMachine, format_report, write_json
+
+        vm = ProfilingVirtualMachine.from_file(args.bytecode)
+        vm.execute()
+
+        report = vm.report()
+        print(format_report(report), file=sys.stderr)
+        if args.profile_json:
+            write_json(report, args.profile_json)
     else:
-        print('No bytecode path specified')
+        vm = VirtualMachine.from_file(args.bytecode)
+        vm.execute()
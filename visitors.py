@@ -1,53 +1,68 @@
 import antlr4
 from antlr4.error.ErrorListener import ErrorListener as BaseErrorListener
 
-from grammar.PjpGrammarParser import PjpGrammarParser
-from grammar.PjpGrammarVisitor import PjpGrammarVisitor
+import ir
+from bytecode import TYPED_OPCODES, TYPE_LETTERS
 
 
-class TypeChecker(PjpGrammarVisitor):
+class Invalid:
+    pass
+
+
+class TypeChecker(ir.Visitor):
+    TYPES = {'int': int, 'float': float, 'string': str, 'bool': bool}
+    COMPARISONS = {'<', '>', '==', '!=', '&&', '||'}
+    ORDERED = {'<', '>'}
+    EQUALITY = {'==', '!='}
+    NUMBERS = (int, float)
+
     def __init__(self):
         self.vars = {}
         self.type_errors = []
 
     @staticmethod
-    def get_type_default_value(_type: str):
-        if _type == 'str':
-            return '""'
-        elif _type == 'int':
-            return 0
-        elif _type == 'float':
-            return 0.0
-        elif _type == 'bool':
-            return False
-        else:
-            print('unknown type {}'.format(_type))
-            return 'UNKNOWN'
-
-    def visitVariableDeclaration(self, ctx: PjpGrammarParser.VariableDeclarationContext):
-        for _id in ctx.ID():
-            val = ctx.TYPE().getText()
-
-            if _id.getText() in self.vars:
-                self.type_errors.append('Multiple declaration of {}'.format(_id.getText()))
+    def numeric_type(left: type | None, right: type | None):
+        if left is int and right is int:
+            return int
+        elif left in (int, float) and right in (int, float):
+            return float
+        return left if left is right else None
+
+    def visitProgram(self, node: ir.Program):
+        self.visitStatements(node.statements)
+
+    def visitWrite(self, node: ir.Write):
+        for expression in node.expressions:
+            self.visit(expression)
+
+    def visitRead(self, node: ir.Read):
+        for name in node.names:
+            if name not in self.vars:
+                self.type_errors.append('{} was not declared'.format(name))
+
+    def visitDeclaration(self, node: ir.Declaration):
+        for name in node.names:
+            if name in self.vars:
+                self.type_errors.append('Multiple declaration of {}'.format(name))
                 break
 
-            self.vars[_id.getText()] = {
-                'type': val,
-                'value': self.get_type_default_value(val)
+            self.vars[name] = {
+                'type': node.type_name
             }
 
-    def visitVariableAssignment(self, ctx: PjpGrammarParser.VariableAssignmentContext):
-        for _id in ctx.ID():
-            if _id.getText() not in self.vars:
-                self.type_errors.append('{} was not declared'.format(_id.getText()))
+    def visitAssignment(self, node: ir.Assignment):
+        current_type = None
+        for name, (line, column) in zip(node.names, node.positions):
+            if name not in self.vars:
+                self.type_errors.append('{} was not declared'.format(name))
                 break
 
-            declared_type = self.vars[_id.getText()]['type']
-            val = self.visit(ctx.expression())
-            current_type = type(val).__name__
-            if current_type == 'str':
-                current_type = 'string'
+            declared_type = self.vars[name]['type']
+            if current_type is None:
+                expression_type = self.visit(node.expression)
+                if expression_type is Invalid:
+                    break
+                current_type = 'string' if expression_type is str else expression_type.__name__
 
             if declared_type == 'int' and current_type == 'float':
                 self.type_errors.append('Trying to assign float to int')
@@ -57,127 +72,99 @@ class TypeChecker(PjpGrammarVisitor):
             is_current_type_num = current_type in ['int', 'float']
 
             if declared_type != current_type and not (is_declared_type_num and is_current_type_num):
-                token = _id.getSymbol()
                 self.type_errors.append("Trying to assign {} to {} at {}:{}"
                 .format(
                     current_type,
                     declared_type,
-                    token.line,
-                    token.column
+                    line,
+                    column
                 ))
 
-            self.vars[_id.getText()]['value'] = val
-
-    def visitAddSubExpression(self, ctx):
-        left = self.visit(ctx.expression(0))
-        right = self.visit(ctx.expression(1))
-
-        left_type = type(left)
-        right_type = type(right)
-
-        if left_type is str or right_type is str:
+    def visitIf(self, node: ir.If):
+        self.visit(node.condition)
+        self.visitStatements(node.then_body)
+        self.visitStatements(node.else_body)
+
+    def visitWhile(self, node: ir.While):
+        self.visit(node.condition)
+        self.visitStatements(node.body)
+
+    def visitBinary(self, node: ir.Binary):
+        left_type = self.visit(node.left)
+        right_type = self.visit(node.right)
+
+        if Invalid in (left_type, right_type):
+            node.type = Invalid
+        elif node.op in self.COMPARISONS:
+            numbers = left_type in self.NUMBERS and right_type in self.NUMBERS
+            if node.op in self.ORDERED and not numbers or node.op in self.EQUALITY and not (
+                    numbers or left_type is right_type):
+                self.type_errors.append('Cannot compare {} and {} with {}'.format(
+                    left_type.__name__, right_type.__name__, node.op))
+            node.type = bool
+        elif node.op == '.':
+            if not (left_type is str and right_type is str):
+                self.type_errors.append(
+                    'Trying to concatenate {} and {}'.format(left_type.__name__, right_type.__name__))
+            node.type = str
+        elif left_type not in self.NUMBERS or right_type not in self.NUMBERS:
             self.type_errors.append(
-                'Undefined operation {} for {} and {}'.format(ctx.op.text, left_type.__name__, right_type.__name__))
-
-        if ctx.op.type == PjpGrammarParser.ADD:
-            return left + right
-        elif ctx.op.type == PjpGrammarParser.SUB:
-            return left - right
-
-    def visitIdExpression(self, ctx: PjpGrammarParser.IdExpressionContext):
-        return self.vars[ctx.ID().getText()]['value']
-
-    def visitMulDivModExpression(self, ctx):
-        left = self.visit(ctx.expression(0))
-        right = self.visit(ctx.expression(1))
-
-        left_type = type(left)
-        right_type = type(right)
-
-        if left_type is str or right_type is str:
-            self.type_errors.append(
-                'Undefined operation {} for {} and {}'.format(ctx.op.text, left_type.__name__, right_type.__name__))
-
-        if ctx.op.type == PjpGrammarParser.MUL:
-            return left * right
-        elif ctx.op.type == PjpGrammarParser.DIV:
-            return left / right
-        elif ctx.op.type == PjpGrammarParser.MOD:
-            if left_type is int and right_type is int:
-                return left % right
-            else:
-                self.type_errors.append('Mod used with {} and {}'.format(left_type.__name__, right_type.__name__))
-                return 0
-
-    def visitNumberExpression(self, ctx):
-        if ctx.INT():
-            val = int(ctx.INT().getText())
+                'Undefined operation {} for {} and {}'.format(node.op, left_type.__name__, right_type.__name__))
+            node.type = Invalid
         else:
-            val = float(ctx.FLOAT().getText())
-
-        return val
-
-    def visitStringExpression(self, ctx):
-        return ctx.STRING().getText()
-
-    def visitBoolExpression(self, ctx: PjpGrammarParser.BoolExpressionContext):
-        return ctx.BOOL().getText() == 'true'
-
-    def visitConcatExpression(self, ctx):
-        left = self.visit(ctx.expression()[0])
-        right = self.visit(ctx.expression()[1])
-
-        left_type = type(left)
-        right_type = type(right)
+            if node.op == '%':
+                if not (left_type is int and right_type is int):
+                    self.type_errors.append('Mod used with {} and {}'.format(left_type.__name__, right_type.__name__))
+                node.type = int
+            else:
+                node.type = self.numeric_type(left_type, right_type)
 
-        if left_type is str and right_type is str:
-            return left + right
-        else:
-            self.type_errors.append('Trying to concatenate {} and {}'.format(left_type.__name__, right_type.__name__))
-            return ''
+        return node.type
 
-    def visitParenExpression(self, ctx):
-        return self.visit(ctx.expression())
+    def visitVariable(self, node: ir.Variable):
+        if node.name not in self.vars:
+            self.type_errors.append('{} was not declared'.format(node.name))
+            node.type = Invalid
+            return Invalid
 
-    def visitLesserGreaterExpression(self, ctx: PjpGrammarParser.LesserGreaterExpressionContext):
-        left = self.visit(ctx.expression()[0])
-        right = self.visit(ctx.expression()[1])
+        node.type = self.TYPES.get(self.vars[node.name]['type'])
+        return node.type
 
-        if ctx.op.type == PjpGrammarParser.LT:
-            result = left < right
-        else:
-            result = left > right
+    def visitNumber(self, node: ir.Number):
+        node.type = type(node.value)
+        return node.type
 
-        return result
+    def visitString(self, node: ir.String):
+        node.type = str
+        return str
 
-    def visitEqualNotEqualExpression(self, ctx: PjpGrammarParser.EqualNotEqualExpressionContext):
-        left = self.visit(ctx.expression()[0])
-        right = self.visit(ctx.expression()[1])
-
-        if ctx.op.type == PjpGrammarParser.EQ:
-            return left == right
-        else:
-            return left != right
+    def visitBool(self, node: ir.Bool):
+        node.type = bool
+        return bool
 
-    def visitLogicalExpression(self, ctx: PjpGrammarParser.LogicalExpressionContext):
-        left = self.visit(ctx.expression()[0])
-        right = self.visit(ctx.expression()[1])
+    def visitNot(self, node: ir.Not):
+        self.visit(node.expression)
 
-        if ctx.op.type == PjpGrammarParser.AND:
-            return left and right
-        else:
-            return left or right
+        node.type = bool
+        return bool
 
-    def visitNotExpression(self, ctx: PjpGrammarParser.NotExpressionContext):
-        return not self.visit(ctx.expression())
 
+class MyVisitor(ir.Visitor):
+    OPCODES = {
+        '+': 'add', '-': 'sub', '*': 'mul', '/': 'div', '%': 'mod', '.': 'concat',
+        '&&': 'and', '||': 'or', '<': 'lt', '>': 'gt', '==': 'eq',
+    }
+    OPERANDS = (ir.Variable, ir.Number, ir.String, ir.Bool)
 
-class MyVisitor(PjpGrammarVisitor):
-    def __init__(self):
+    def __init__(self, slots=False, typed=False, lines=False):
+        self.slots = slots
+        self.typed = typed
+        self.lines = lines
         self.vars = {}
         self.instuctions = []
         self.last_declared_type = None
         self.last_label_id = -1
+        self.last_line = None
 
     def push(self, val):
         _type = self.infer_bytecode_type(val)
@@ -226,90 +213,175 @@ class MyVisitor(PjpGrammarVisitor):
             print('unknown type {}'.format(_type))
             return 'UNKNOWN'
 
+    def variable_operand(self, name: str):
+        return self.vars[name]['slot'] if self.slots else name
+
+    def symbol_table(self):
+        return ['var {} {}'.format(var['slot'], name) for name, var in self.vars.items()]
+
+    def typed_opcode(self, opcode: str, left: type | None, right: type | None):
+        if not self.typed:
+            return opcode
+
+        types = {left, right}
+        if types == {int, float}:
+            suffix = 'f'
+        elif len(types) == 1 and left in TYPE_LETTERS:
+            suffix = TYPE_LETTERS[left].lower()
+        else:
+            return opcode
+
+        return opcode + suffix if suffix in TYPED_OPCODES[opcode] else opcode
+
     def get_next_label_id(self):
         self.last_label_id = self.last_label_id + 1
         return self.last_label_id
 
-    def visitProgram(self, ctx: PjpGrammarParser.ProgramContext):
-        [self.visit(value) for value in ctx.statement()]
+    def visitStatements(self, statements: list):
+        for statement in statements:
+            if self.lines and statement.line != self.last_line:
+                self.last_line = statement.line
+                self.add_instruction('line {}'.format(statement.line))
+            self.visit(statement)
+
+    def declared_names(self, statements: list):
+        for statement in statements:
+            if isinstance(statement, ir.Declaration):
+                yield from statement.names
+            elif isinstance(statement, ir.If):
+                yield from self.declared_names(statement.then_body)
+                yield from self.declared_names(statement.else_body)
+            elif isinstance(statement, ir.While):
+                yield from self.declared_names(statement.body)
+
+    def stream(self, node: ir.Program):
+        if self.slots:
+            yield ['var {} {}'.format(slot, name) for slot, name in enumerate(self.declared_names(node.statements))]
+
+        statements = node.statements
+        statements.reverse()
+        while statements:
+            yield self.emit_statement(statements.pop())
+
+    def emit_statement(self, statement: ir.Statement) -> list:
+        self.visitStatements([statement])
+        chunk, self.instuctions = self.instuctions, []
+        return chunk
+
+    def visitProgram(self, node: ir.Program):
+        self.visitStatements(node.statements)
+
+        if self.slots:
+            self.instuctions = self.symbol_table() + self.instuctions
         return self.instuctions
 
-    def visitWrite(self, ctx: PjpGrammarParser.WriteContext):
-        [self.visit(value) for value in ctx.expression()]
+    def visitWrite(self, node: ir.Write):
+        for expression in node.expressions:
+            self.visit(expression)
 
-        self.add_instruction('print {}'.format(len(ctx.expression())))
+        self.add_instruction('print {}'.format(len(node.expressions)))
 
-    def visitRead(self, ctx: PjpGrammarParser.ReadContext):
-        for _id in ctx.ID():
-            _type = self.vars[_id.getText()]['type']
+    def visitRead(self, node: ir.Read):
+        for name in node.names:
+            _type = self.vars[name]['type']
 
             self.add_instruction('read {}'.format(self.type_2_bytecode_type(_type)))
-            self.add_instruction('save {}'.format(_id))
+            self.add_instruction('save {}'.format(self.variable_operand(name)))
 
-    def visitVariableDeclaration(self, ctx: PjpGrammarParser.VariableDeclarationContext):
-        for _id in ctx.ID():
-            self.last_declared_type = _type = self.type_2_bytecode_type(ctx.TYPE().getText())
+    def visitDeclaration(self, node: ir.Declaration):
+        for name in node.names:
+            self.last_declared_type = _type = self.type_2_bytecode_type(node.type_name)
             value = self.get_type_default_value(_type)
 
-            self.vars[_id.getText()] = {
-                'type': ctx.TYPE().getText(),
-                'value': value
+            self.vars[name] = {
+                'type': node.type_name,
+                'slot': len(self.vars)
             }
 
             self.push(value)
-            self.add_instruction('save {}'.format(_id))
+            self.add_instruction('save {}'.format(self.variable_operand(name)))
 
-    def visitVariableAssignment(self, ctx: PjpGrammarParser.VariableAssignmentContext):
-        is_multiple_assignment = len(ctx.ID()) > 1
-        last_val = None
+    def visitAssignment(self, node: ir.Assignment):
+        for i, name in enumerate(reversed(node.names)):
+            _type = self.vars[name]['type']
 
-        for _id in reversed(ctx.ID()):
-            _type = self.vars[_id.getText()]['type']
-
-            if last_val is None or not is_multiple_assignment:
-                last_val = val = self.visit(ctx.expression())
-                if type(val) is int and _type == 'float':
+            if i == 0:
+                self.visit(node.expression)
+                if node.expression.type is int and _type == 'float':
                     self.add_instruction('itof')
-                self.vars[_id.getText()]['value'] = val
 
-            self.add_instruction('save {}'.format(_id))
-            self.add_instruction('load {}'.format(_id))
+            self.add_instruction('save {}'.format(self.variable_operand(name)))
+            self.add_instruction('load {}'.format(self.variable_operand(name)))
 
         self.add_instruction('pop')
 
-    def visitAddSubExpression(self, ctx):
-        left = self.visit(ctx.expression(0))
-        right = self.visit(ctx.expression(1))
-
-        if ctx.op.type == PjpGrammarParser.ADD:
-            self.add_instruction('add')
-            return left + right
-        elif ctx.op.type == PjpGrammarParser.SUB:
-            self.add_instruction('sub')
-            return left - right
-
-    def visitMulDivModExpression(self, ctx):
-        left = self.visit(ctx.expression(0))
-        right = self.visit(ctx.expression(1))
-
-        if type(left) is float and type(right) is int:
-            self.add_instruction('itof')
-
-        if ctx.op.type == PjpGrammarParser.MUL:
-            self.add_instruction('mul')
-            return left * right
-        elif ctx.op.type == PjpGrammarParser.DIV:
-            self.add_instruction('div')
-            return left / right
-        elif ctx.op.type == PjpGrammarParser.MOD:
-            self.add_instruction('mod')
-            return left % right
-
-    def visitNumberExpression(self, ctx):
-        if ctx.INT():
-            val = int(ctx.INT().getText())
+    def branch_if_false(self, node, label: int):
+        if isinstance(node, ir.Binary) and node.op == '&&':
+            self.branch_if_false(node.left, label)
+            self.branch_if_false(node.right, label)
+        elif isinstance(node, ir.Binary) and node.op == '||':
+            right_label = self.get_next_label_id()
+            true_label = self.get_next_label_id()
+
+            self.branch_if_false(node.left, right_label)
+            self.add_instruction('jmp {}'.format(true_label))
+            self.add_instruction('label {}'.format(right_label))
+            self.branch_if_false(node.right, label)
+            self.add_instruction('label {}'.format(true_label))
+        else:
+            self.visit(node)
+            self.add_instruction('fjmp {}'.format(label))
+
+    def short_circuit(self, node: ir.Binary):
+        self.visit(node.left)
+
+        skip_label = self.get_next_label_id()
+        end_label = self.get_next_label_id()
+        self.add_instruction('fjmp {}'.format(skip_label))
+        if node.op == '&&':
+            self.visit(node.right)
+            self.add_instruction('jmp {}'.format(end_label))
+            self.add_instruction('label {}'.format(skip_label))
+            self.push(False)
+        else:
+            self.push(True)
+            self.add_instruction('jmp {}'.format(end_label))
+            self.add_instruction('label {}'.format(skip_label))
+            self.visit(node.right)
+
+        self.add_instruction('label {}'.format(end_label))
+
+    def visitBinary(self, node: ir.Binary):
+        if node.op in ('&&', '||') and not isinstance(node.right, self.OPERANDS):
+            return self.short_circuit(node)
+
+        self.visit(node.left)
+        self.visit(node.right)
+        left_type = node.left.type
+        right_type = node.right.type
+
+        if node.op in ('*', '/', '%'):
+            if left_type is float and right_type is int:
+                self.add_instruction('itof')
+        elif node.op in ('<', '>', '==', '!='):
+            if left_type is int and right_type is float:
+                self.insert_instruction('itof', -1)
+
+            if right_type is int and left_type is float:
+                self.add_instruction('itof')
+
+        if node.op in ('.', '&&', '||'):
+            self.add_instruction(self.OPCODES[node.op])
+        elif node.op != '!=':
+            self.add_instruction(self.typed_opcode(self.OPCODES[node.op], left_type, right_type))
+        elif self.typed_opcode('neq', left_type, right_type) != 'neq':
+            self.add_instruction(self.typed_opcode('neq', left_type, right_type))
         else:
-            val = float(ctx.FLOAT().getText())
+            self.add_instruction('eq')
+            self.add_instruction('not')
+
+    def visitNumber(self, node: ir.Number):
+        val = node.value
 
         is_uminus = val < 0
         if is_uminus:
@@ -320,119 +392,39 @@ class MyVisitor(PjpGrammarVisitor):
         if is_uminus:
             self.add_instruction('uminus')
 
-        return val
-
-    def visitStringExpression(self, ctx):
-        return self.push(ctx.STRING().getText())
-
-    def visitBoolExpression(self, ctx: PjpGrammarParser.BoolExpressionContext):
-        return self.push(ctx.BOOL().getText() == 'true')
-
-    def visitConcatExpression(self, ctx):
-        left = self.visit(ctx.expression()[0])
-        right = self.visit(ctx.expression()[1])
-
-        self.add_instruction('concat')
-        return left + right
-
-    def visitParenExpression(self, ctx):
-        return self.visit(ctx.expression())
-
-    def visitIdExpression(self, ctx: PjpGrammarParser.IdExpressionContext):
-        self.add_instruction('load {}'.format(ctx.ID().getText()))
-        return self.vars[ctx.ID().getText()]['value']
-
-    def visitLesserGreaterExpression(self, ctx: PjpGrammarParser.LesserGreaterExpressionContext):
-        left = self.visit(ctx.expression()[0])
-        right = self.visit(ctx.expression()[1])
-
-        left_type = type(left)
-        right_type = type(right)
-
-        if left_type is int and right_type is float:
-            self.insert_instruction('itof', -1)
-
-        if right_type is int and left_type is float:
-            self.add_instruction('itof')
-
-        if ctx.op.type == PjpGrammarParser.LT:
-            self.add_instruction('lt')
-            result = left < right
-        else:
-            self.add_instruction('gt')
-            result = left > right
+    def visitString(self, node: ir.String):
+        self.push(node.value)
 
-        return result
+    def visitBool(self, node: ir.Bool):
+        self.push(node.value)
 
-    def visitEqualNotEqualExpression(self, ctx: PjpGrammarParser.EqualNotEqualExpressionContext):
-        left = self.visit(ctx.expression()[0])
-        right = self.visit(ctx.expression()[1])
+    def visitVariable(self, node: ir.Variable):
+        self.add_instruction('load {}'.format(self.variable_operand(node.name)))
 
-        left_type = type(left)
-        right_type = type(right)
-
-        if left_type is int and right_type is float:
-            self.insert_instruction('itof', -1)
-
-        if right_type is int and left_type is float:
-            self.add_instruction('itof')
-
-        if ctx.op.type == PjpGrammarParser.EQ:
-            self.add_instruction('eq')
-        else:
-            self.add_instruction('eq')
-            self.add_instruction('not')
-
-    def visitLogicalExpression(self, ctx: PjpGrammarParser.LogicalExpressionContext):
-        self.visit(ctx.expression()[0])
-        self.visit(ctx.expression()[1])
-
-        if ctx.op.type == PjpGrammarParser.AND:
-            self.add_instruction('and')
-        else:
-            self.add_instruction('or')
-
-    def visitNotExpression(self, ctx: PjpGrammarParser.NotExpressionContext):
-        self.visit(ctx.expression())
+    def visitNot(self, node: ir.Not):
+        self.visit(node.expression)
         self.add_instruction('not')
-        return ctx
-
-    def visitIfStatement(self, ctx: PjpGrammarParser.IfStatementContext):
-        self.visit(ctx.expression())
 
+    def visitIf(self, node: ir.If):
         fjmp_label = self.get_next_label_id()
-        self.add_instruction('fjmp {}'.format(fjmp_label))
-        self.visit(ctx.statement()[0])
+        self.branch_if_false(node.condition, fjmp_label)
+        self.visitStatements(node.then_body)
 
         jmp_label = self.get_next_label_id()
         self.add_instruction('jmp {}'.format(jmp_label))
         self.add_instruction('label {}'.format(fjmp_label))
-        self.visit(ctx.statement()[1])
-
-        self.add_instruction('label {}'.format(jmp_label))
-
-    def visitIfStatementBody(self, ctx: PjpGrammarParser.IfStatementBodyContext):
-        self.visit(ctx.expression())
-
-        fjmp_label = self.get_next_label_id()
-        self.add_instruction('fjmp {}'.format(fjmp_label))
-        [self.visit(value) for value in ctx.statement()]
+        self.visitStatements(node.else_body)
 
-        jmp_label = self.get_next_label_id()
-        self.add_instruction('jmp {}'.format(jmp_label))
-        self.add_instruction('label {}'.format(fjmp_label))
         self.add_instruction('label {}'.format(jmp_label))
 
-    def visitWhileStatement(self, ctx: PjpGrammarParser.WhileStatementContext):
+    def visitWhile(self, node: ir.While):
         label = self.get_next_label_id()
         self.add_instruction('label {}'.format(label))
 
-        self.visit(ctx.expression())
-
         fjmp_label = self.get_next_label_id()
-        self.add_instruction('fjmp {}'.format(fjmp_label))
+        self.branch_if_false(node.condition, fjmp_label)
 
-        [self.visit(value) for value in ctx.statement()]
+        self.visitStatements(node.body)
 
         self.add_instruction('jmp {}'.format(label))
         self.add_instruction('label {}'.format(fjmp_label))